@@ -0,0 +1,77 @@
+import argparse
+import http.client
+import json
+import socket
+import sys
+from typing import Dict, List, Tuple
+from urllib.parse import urlencode
+
+# Thin client of the analysis server(visualizer.py --serve), only uses the standard library so it starts instantly
+
+DEFAULT_ADDRESS = "127.0.0.1:8765"  # Same as analysis_server.DEFAULT_ADDRESS, not imported to keep pandas out of the client
+QUERIES = ["info", "summary", "cactus", "unsolved", "tagsets"]
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path: str, timeout: float | None = None):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+def query(address: str, name: str, parameters: Dict[str, List[str] | str], timeout: float | None = None) -> Tuple[int, bytes]:
+    """
+    Send a query to the analysis server
+    :param address host:port or unix:/path/to/socket
+    :returns The http status and the body of the response
+    """
+    if address.startswith("unix:"):
+        connection: http.client.HTTPConnection = UnixHTTPConnection(address[len("unix:"):], timeout)
+    else:
+        host, _, port = address.rpartition(":")
+        connection = http.client.HTTPConnection(host or "127.0.0.1", int(port), timeout=timeout)
+
+    try:
+        connection.request("GET", f"/{name}?{urlencode(parameters, doseq=True)}")
+        response = connection.getresponse()
+        return response.status, response.read()
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query a running analysis server(visualizer.py --serve)")
+    parser.add_argument("query", type=str, choices=QUERIES, help="The query to send")
+    parser.add_argument("--address", type=str, default=DEFAULT_ADDRESS, help=f"Address of the server, host:port or unix:/path (default: {DEFAULT_ADDRESS})")
+    parser.add_argument("--having", nargs="+", type=str, help="Only problems having all of these tags")
+    parser.add_argument("--exact", nargs="+", type=str, help="Only problems having exactly these tags")
+    parser.add_argument("--by-tagset", action="store_true", help="Summary table for every tagset, only applicable to summary")
+    parser.add_argument("--solver", type=str, help="Problems unsolved by this solver instead of by all solvers, only applicable to unsolved")
+    parser.add_argument("--json", action="store_true", help="Print the raw json instead of text")
+    args = parser.parse_args()
+
+    parameters: Dict[str, List[str] | str] = {"format": "json" if args.json else "text"}
+    if args.having:
+        parameters["having"] = args.having
+    if args.exact:
+        parameters["exact"] = args.exact
+    if args.by_tagset:
+        parameters["by"] = "tagset"
+    if args.solver:
+        parameters["solver"] = args.solver
+
+    try:
+        status, body = query(args.address, args.query, parameters)
+    except OSError as e:
+        print(f"Could not reach the analysis server at {args.address}: {e}")
+        sys.exit(1)
+
+    if status != 200:
+        print(f"Error: {json.loads(body)['error']}")
+        sys.exit(1)
+
+    print(body.decode("utf-8"))
@@ -0,0 +1,250 @@
+import inspect
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+import portfolio
+import tag_util
+import visualizer
+from distributed import is_local
+
+# Long-lived analysis server, the parsed results and the tag index are loaded once and queried over http,
+# on a tcp port or a unix socket(unix:/path/to/socket). Every query takes the optional filters
+# having=TAG(repeatable), exact=TAG(repeatable) and format=json|text:
+#   /info                    Size of the loaded dataset
+#   /summary?by=tagset       The summary table, by=tagset for one row per solver and tagset
+#   /cactus                  The sorted runtimes of the solved problems per solver and of the virtual best solver
+#   /unsolved?solver=NAME    Problems no solver(or the given solver) solved
+#   /tagsets                 The tagsets and their number of problems
+# See analysis_client.py for a client
+
+DEFAULT_ADDRESS = "127.0.0.1:8765"
+CACHE_SIZE = 256  # Cached responses
+FRAME_CACHE_SIZE = 16  # Cached filtered dataframes
+
+
+class BadQuery(ValueError):
+    pass
+
+
+Filter = Tuple[str, frozenset]  # ("having" | "exact" | "", tags)
+
+
+class LRUCache:
+    """
+    Thread safe cache that drops the least recently used entries once it holds more than size entries
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self.entries: OrderedDict = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, compute: Callable[[], Any]):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+
+        # Computed outside the lock, so slow queries don't block cached ones
+        value = compute()
+        with self.lock:
+            self.entries[key] = value
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+        return value
+
+
+class Dataset:
+    """
+    The loaded results and tags, answers queries and caches their responses keyed by the query and its filter
+    """
+
+    def __init__(self, df, tags: tag_util.TagIndex | None = None):
+        self.df = df
+        self.tags = tags
+        self.responses = LRUCache(CACHE_SIZE)
+        self.frames = LRUCache(FRAME_CACHE_SIZE)
+        self.queries: Dict[str, Callable[..., Tuple[Any, str]]] = {
+            "info": self.info,
+            "summary": self.summary,
+            "cactus": self.cactus,
+            "unsolved": self.unsolved,
+            "tagsets": self.tagsets,
+        }
+
+    def filtered(self, selection: Filter):
+        kind, tagset = selection
+        if not kind:
+            return self.df
+        if self.tags is None:
+            raise BadQuery("Filtering by tags requires the server to be started with --tags")
+
+        if kind == "having":
+            return self.frames.get(selection, lambda: tag_util.find_having_tags(self.df, self.tags, tagset))
+        return self.frames.get(selection, lambda: tag_util.find_exact_tagset(self.df, self.tags, tagset))
+
+    def answer(self, query: str, parameters: Dict[str, List[str]]) -> Tuple[bytes, str]:
+        """
+        :returns The encoded response and its content type, from the cache if the same query was answered before
+        :raises BadQuery If the query or its parameters are invalid
+        """
+        if query not in self.queries:
+            raise BadQuery(f"Unknown query {query}, expected one of {', '.join(self.queries)}")
+
+        having = frozenset(parameters.pop("having", []))
+        exact = frozenset(parameters.pop("exact", []))
+        if having and exact:
+            raise BadQuery("having and exact can not be used at the same time")
+        selection: Filter = ("having", having) if having else ("exact", exact) if exact else ("", frozenset())
+
+        text = parameters.pop("format", ["json"])[-1] == "text"
+        options = tuple(sorted((key, values[-1]) for key, values in parameters.items()))
+        accepted = list(inspect.signature(self.queries[query]).parameters)[1:]
+        for option, _ in options:
+            if option not in accepted:
+                raise BadQuery(f"Unknown parameter {option} of {query}")
+        key = (query, selection, options, text)
+
+        def compute() -> Tuple[bytes, str]:
+            result, rendered = self.queries[query](self.filtered(selection), **dict(options))
+            if text:
+                return rendered.encode("utf-8"), "text/plain; charset=utf-8"
+            return json.dumps(result).encode("utf-8"), "application/json"
+
+        if query == "info":
+            return compute()  # Reports the cache itself
+        return self.responses.get(key, compute)
+
+    def info(self, df) -> Tuple[Any, str]:
+        result = {
+            "rows": len(df),
+            "problems": int(df["problem"].nunique()),
+            "solvers": sorted(map(str, df["solver"].unique())),
+            "tags": self.tags is not None,
+            "cache": {"entries": len(self.responses.entries), "hits": self.responses.hits, "misses": self.responses.misses},
+        }
+        return result, json.dumps(result, indent=2)
+
+    def summary(self, df, by: str | None = None) -> Tuple[Any, str]:
+        if by == "tagset":
+            if self.tags is None:
+                raise BadQuery("by=tagset requires the server to be started with --tags")
+            table = visualizer.summary_table(tag_util.with_tagsets(df, self.tags), by="tagset")
+        elif by is None:
+            table = visualizer.summary_table(df)
+        else:
+            raise BadQuery(f"Unknown grouping {by}, only tagset is supported")
+
+        return json.loads(table.to_json(orient="split", index=False)), table.to_string(index=False)
+
+    def cactus(self, df) -> Tuple[Any, str]:
+        _, solvers, matrix = portfolio.runtime_matrix(df)
+        result = {str(solver): portfolio.cactus_data(matrix[:, i]).tolist() for i, solver in enumerate(solvers)}
+        result["virtual best"] = portfolio.cactus_data(portfolio.virtual_best(matrix)).tolist()
+
+        rendered = "\n".join(f"{solver}: {len(times)} solved, {sum(times):.2f} ms" for solver, times in result.items())
+        return result, rendered
+
+    def unsolved(self, df, solver: str | None = None) -> Tuple[Any, str]:
+        problems, solvers, matrix = portfolio.runtime_matrix(df)
+        if solver is None:
+            times = portfolio.virtual_best(matrix)
+        elif solver in solvers:
+            times = matrix[:, solvers.index(solver)]
+        else:
+            raise BadQuery(f"Unknown solver {solver}")
+
+        result = sorted(map(str, problems[~np.isfinite(times)]))
+        return result, "\n".join(result)
+
+    def tagsets(self, df) -> Tuple[Any, str]:
+        if self.tags is None:
+            raise BadQuery("Tagsets require the server to be started with --tags")
+
+        labelled = tag_util.with_tagsets(df, self.tags)
+        counts = labelled.groupby("tagset", observed=True)["problem"].nunique().sort_values(ascending=False)
+        result = {str(label): int(count) for label, count in counts.items()}
+        return result, "\n".join(f"{count:>8}  {label}" for label, count in result.items())
+
+
+def make_handler(dataset: Dataset):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlsplit(self.path)
+            try:
+                body, content_type = dataset.answer(url.path.strip("/") or "info", parse_qs(url.query))
+                status = 200
+            except BadQuery as e:
+                body, content_type, status = json.dumps({"error": str(e)}).encode("utf-8"), "application/json", 400
+            except Exception as e:
+                body, content_type, status = json.dumps({"error": f"{type(e).__name__}: {e}"}).encode("utf-8"), "application/json", 500
+
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # Queries are answered in milliseconds, an access log would only slow them down
+
+    return Handler
+
+
+class UnixHTTPServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        request, _ = super().get_request()
+        return request, ("local", 0)  # BaseHTTPRequestHandler expects a (host, port) client address
+
+
+def serve(df, tags: tag_util.TagIndex | None = None, address: str = DEFAULT_ADDRESS):
+    """
+    Answer queries on the loaded results until interrupted
+    :param address host:port or unix:/path/to/socket, only localhost or a unix socket, there is no authentication
+    :raises ValueError If the address is not on localhost
+    """
+    host, _, port = address.rpartition(":")
+    host = host or "127.0.0.1"
+    if not address.startswith("unix:") and not is_local(host):
+        raise ValueError(f"Refusing to serve on {host}, the server has no authentication, use localhost or a unix socket")
+
+    dataset = Dataset(df, tags)
+    handler = make_handler(dataset)
+
+    if address.startswith("unix:"):
+        path = address[len("unix:"):]
+        if os.path.exists(path):
+            os.unlink(path)
+        server = UnixHTTPServer(path, handler)
+    else:
+        server = ThreadingHTTPServer((host, int(port)), handler)
+
+    # Stop on SIGTERM the same as on Ctrl+C, so the unix socket is removed
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
+    print(f"[+] Serving {len(df)} results on {address}, stop with Ctrl+C")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if server.address_family == socket.AF_UNIX and os.path.exists(server.server_address):
+            os.unlink(server.server_address)
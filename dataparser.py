@@ -1,22 +1,57 @@
 import pandas as pd
-import re
+import numpy as np
 import os
 from pathlib import Path
-from typing import List, Set, Tuple, Dict
+from typing import Any, FrozenSet, Iterable, Iterator, List, Tuple, Dict
+from multiprocessing import Pool
 import sys
 import argparse
 import json
-
-TIMEOUT_STRING = "timeout"
-OSTRICH_TIMEOUT_STRING = "unknown"
-CVC5_TIMEOUT_STRING = "cvc5 interrupted by timeout."
-PERF_START_STRING = "Performance counter stats for "
-
-Timeout = "Timeout"
+import pickle
+import sqlite3
+from itertools import islice
+
+from measure import PERF_START_STRING, parse_perf_stats
+from features import STAT_NAMES, scan_entry
+from results import RESULTS_DIR, ALIASES_DIR, TIMEOUT_STRING, OSTRICH_TIMEOUT_STRING, CVC5_TIMEOUT_STRING, Timeout, shard_paths, iter_records
+
+# Columns of the result store that are not part of the parsed dataframe
+STORE_ONLY_COLUMNS = ["returncode", "stdout_tail", "stderr_tail", "time", "cached", "task_clock_samples"]
+
+# Fixed schema used when streaming, stats not listed here are dropped
+RESULT_COLUMNS = ["problem", "solver", "status", "sanity_sat"]
+STAT_COLUMNS = [
+    "task-clock:u",
+    # rusage backend
+    "user_time", "sys_time", "wall_time", "max_rss", "voluntary_context_switches", "involuntary_context_switches",
+    # Whole process tree of a run, both backends
+    "tree_cpu_time", "tree_max_rss", "leaked_processes",
+    # Repeated measurements(runner --repeat), in msec, task-clock:u is their median
+    "repeats", "task_clock_mean", "task_clock_median", "task_clock_std", "task_clock_ci",
+    # perf backend
+    "context-switches:u", "cpu-migrations:u", "page-faults:u", "cycles:u", "instructions:u", "branches:u", "branch-misses:u",
+    "elapsed", "user", "sys",
+]
+
+# Schema of the parsed dataframes
+# Strings are interned as categories, the problems are additionally stored as a separate dimension table
+# in the typed formats, the result table only holds the integer problem ids
+CATEGORICAL_COLUMNS = ["problem", "solver", "status", "sanity_sat", "tags"]
+FLOAT_COLUMNS = ["task-clock:u", "user_time", "sys_time", "wall_time", "tree_cpu_time", "elapsed", "user", "sys",
+                 "task_clock_mean", "task_clock_median", "task_clock_std", "task_clock_ci"]  # float32
+INT_COLUMNS = [c for c in STAT_COLUMNS if c not in FLOAT_COLUMNS]  # Nullable Int64, NA for runs without stats
+
+PROBLEMS_SUFFIX = "_problems"  # Appended to the output name for the problem dimension table
+STATS_SUFFIX = "_stats"  # Appended to the output name for the statistics of scanned smt2 files
+
+CHUNK_SIZE = 50_000  # Rows per chunk when streaming
+TAGFILE = "tags.json"
+CACHE_SUFFIX = ".cache.sqlite"  # Appended to the output name for the incremental parse cache
 
 
 def clean_lines(text):
-    return [re.sub(r"\s+", ' ', line).strip() for line in text if line.strip()]
+    # Collapse all whitespace, str.split is a lot faster than a regex substitution per line
+    return [" ".join(line.split()) for line in text if line.strip()]
 
 
 def parse_file(path: str):
@@ -55,23 +90,40 @@ def parse_file(path: str):
         return (3, "Error")
 
 
-def parse_perf_stats(stats: List[str]):
-    result = {}
+def parse_row(file: str) -> Dict[str, Any] | None:
+    """
+    Parse a single .out file into a row of the result dataframe
+    """
+    parsed = parse_file(file)
+    if not parsed:
+        return None
+
+    # Extract the base name of the file
+    base_name = os.path.basename(file).replace('.out', '')
+
+    # Split the base name by underscores to separate problem name and solver name
+    # FIXME: Name cannot contain _
+    name_parts = base_name.split('_')
+
+    # Problem name is everything except the last part
+    problem_name = '_'.join(name_parts[:-1])
 
-    for line in stats[1:]:
-        parts = line.split("#")[0].strip()  # Split at '#' and take the part before it
-        if not parts:
-            continue
+    # Prepend the directory to the problem name
+    problem_name = f"{os.path.dirname(file)}/{problem_name}"
 
-        value, key = parts.rsplit(maxsplit=1)
-        # Can't remember this edgecase
-        if value.count('.') > 1:
-            parts = value.split('.')  # type: ignore # (Reassigning variable)
-            value = "".join(parts[0:-1]) + "." + parts[-1]
+    # Solver name is the last part
+    solver_name = name_parts[-1]
 
-        result[key] = value.split(maxsplit=1)[0].replace(",", "")
+    if parsed[0] != 0:
+        if parsed[1] == Timeout:
+            return {"problem": problem_name, "solver": solver_name, "status": "Timeout", "sanity_sat": None}
+        else:
+            return {"problem": problem_name, "solver": solver_name, "status": "Error", "sanity_sat": None}
 
-    return result
+    perf_stats = parse_perf_stats(parsed[2])
+    sanity_sat = parsed[1]
+
+    return {"problem": problem_name, "solver": solver_name, "status": "Success", "sanity_sat": sanity_sat, **perf_stats}
 
 
 def parse_files(files):
@@ -84,112 +136,568 @@ def parse_files(files):
         #sys.stdout.write(f"\r{progress_bar}")
         #sys.stdout.flush()
 
-        parsed = parse_file(file)
-        if not parsed:
-            continue
+        result = parse_row(file)
+        if result is not None:
+            data.append(result)
+
+    print("\n[+]Parsing dataframe")
+
+    return pd.DataFrame(data)
+
+
+############ STREAMING ############
+
+def iter_out_entries(path: str) -> Iterator[os.DirEntry]:
+    """
+    Lazily walk a directory and yield all .out files, without building a list of the whole tree
+    """
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from iter_out_entries(entry.path)
+            elif entry.name.endswith(".out"):
+                yield entry
+
+
+def iter_out_files(path: str) -> Iterator[str]:
+    return (entry.path for entry in iter_out_entries(path))
+
+
+def iter_rows(files: Iterable[str], workers: int) -> Iterator[Dict[str, Any]]:
+    """
+    Parse the files across a pool of processes, rows are yielded as soon as they are parsed
+    """
+    with Pool(workers) as pool:
+        for row in pool.imap_unordered(parse_row, files, chunksize=64):
+            if row is not None:
+                yield row
+
+
+def iter_chunks(rows: Iterable[Dict[str, Any]], chunk_size: int = CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """
+    Collect rows into typed column buffers and yield them as dataframes of at most chunk_size rows
+    Every chunk has the same columns, so the chunks can be written one after the other
+    """
+    columns = RESULT_COLUMNS + STAT_COLUMNS
+    buffers: Dict[str, List[Any]] = {column: [] for column in columns}
+    size = 0
+
+    def flush() -> pd.DataFrame:
+        chunk = pd.DataFrame({column: buffers[column] for column in RESULT_COLUMNS}, dtype=object)
+        for column in STAT_COLUMNS:
+            chunk[column] = pd.to_numeric(pd.Series(buffers[column], dtype=object), errors="coerce").astype("float64")
+        for buffer in buffers.values():
+            buffer.clear()
+        return chunk
+
+    for row in rows:
+        for column in columns:
+            buffers[column].append(row.get(column))
+        size += 1
+
+        if size == chunk_size:
+            yield flush()
+            size = 0
+
+    if size > 0:
+        yield flush()
+
+
+def apply_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convert the known columns to the compact types of the schema,
+    categories for the repeating strings, float32 for times and Int64 for counters
+    """
+    for column in CATEGORICAL_COLUMNS:
+        if column in df.columns and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype("category")
+
+    for column in FLOAT_COLUMNS:
+        if column in df.columns:
+            df[column] = pd.to_numeric(df[column], errors="coerce").astype("float32")
+
+    for column in INT_COLUMNS:
+        if column in df.columns:
+            df[column] = pd.to_numeric(df[column], errors="coerce").round().astype("Int64")
 
-        result = {}
+    return df
+
+
+def intern_problems(chunk: pd.DataFrame, problem_ids: Dict[str, int]) -> pd.DataFrame:
+    """
+    Replace the problem column with integer ids, new problems are added to `problem_ids`
+    The ids are only computed once per category, not once per row
+    """
+    problems = chunk["problem"].astype("category").cat
+    category_ids = np.array([problem_ids.setdefault(problem, len(problem_ids)) for problem in problems.categories], dtype=np.int32)
 
-        # Extract the base name of the file
-        base_name = os.path.basename(file).replace('.out', '')
+    chunk = chunk.drop(columns="problem")
+    chunk.insert(0, "problem_id", category_ids[problems.codes.to_numpy()])
 
-        # Split the base name by underscores to separate problem name and solver name
-        # FIXME: Name cannot contain _
-        name_parts = base_name.split('_')
+    return chunk
 
-        # Problem name is everything except the last part
-        problem_name = '_'.join(name_parts[:-1])
 
-        # Prepend the directory to the problem name
-        problem_name = f"{os.path.dirname(file)}/{problem_name}"
+def problems_path(output: str, extension: str) -> str:
+    return f"{output}{PROBLEMS_SUFFIX}{extension}"
+
+
+def arrow_table(chunk: pd.DataFrame):
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(chunk, preserve_index=False)
+
+    # pandas picks the smallest index type per chunk, use the same dictionary type for all chunks
+    fields = [
+        pa.field(field.name, pa.dictionary(pa.int32(), pa.string())) if pa.types.is_dictionary(field.type) else field
+        for field in table.schema
+    ]
+    return table.cast(pa.schema(fields, metadata=table.schema.metadata))
 
-        # Solver name is the last part
-        solver_name = name_parts[-1]
 
-        if parsed[0] != 0:
-            if parsed[1] == Timeout:
-                result = {"problem": problem_name, "solver": solver_name, "status": "Timeout", "sanity_sat": None}
+def write_chunks(chunks: Iterable[pd.DataFrame], output: str, format: str = "csv") -> int:
+    """
+    Write the chunks one by one to `output`.`format`
+    For csv and parquet only one chunk is held in memory at a time, feather files can only be written as a whole,
+    so the chunks are collected as compact arrow tables first
+    The typed formats store the problems in a separate dimension table `output`_problems.`format`
+    :returns The number of written rows
+    """
+    written = 0
+    writer = None
+    tables = []
+    problem_ids: Dict[str, int] = {}
+
+    try:
+        for chunk in chunks:
+            chunk.index = pd.RangeIndex(written, written + len(chunk))
+
+            if format != "csv" and "problem" in chunk.columns:
+                chunk = intern_problems(apply_dtypes(chunk), problem_ids)
+
+            if format == "parquet":
+                import pyarrow.parquet as pq
+
+                table = arrow_table(chunk)
+                if writer is None:
+                    writer = pq.ParquetWriter(f"{output}.parquet", table.schema, compression="zstd")
+                writer.write_table(table)
+            elif format == "feather":
+                tables.append(arrow_table(chunk))
             else:
-                result = {"problem": problem_name, "solver": solver_name, "status": "Error", "sanity_sat": None}
+                chunk.to_csv(f"{output}.csv", mode="w" if written == 0 else "a", header=written == 0)
+
+            written += len(chunk)
+            print(f"[+]Written {written} rows")
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if tables:
+        import pyarrow as pa
+        import pyarrow.feather as feather
 
+        feather.write_feather(pa.concat_tables(tables).unify_dictionaries(), f"{output}.feather", compression="zstd")
+
+    if problem_ids:
+        problems = pd.DataFrame({"problem_id": np.arange(len(problem_ids), dtype=np.int32), "problem": list(problem_ids)})
+        if format == "parquet":
+            problems.to_parquet(problems_path(output, ".parquet"), compression="zstd", index=False)
         else:
-            perf_stats = parse_perf_stats(parsed[2])
-            sanity_sat = parsed[1]
+            problems.to_feather(problems_path(output, ".feather"), compression="zstd")
 
-            result = {"problem": problem_name, "solver": solver_name, "status": "Success", "sanity_sat": sanity_sat, **perf_stats}
+    return written
 
-        data.append(result)
 
-    print("\n[+]Parsing dataframe")
+def load_results(path: str, columns: List[str] | None = None) -> pd.DataFrame:
+    """
+    Load a dataframe stored by the dataparser, as csv, parquet or feather
+    :param columns Only load these columns, parquet and feather only read the requested columns from disk
+    :returns The dataframe with the same compact types, independent of the format
+    """
+    base, extension = os.path.splitext(path)
 
-    return pd.DataFrame(data)
+    if extension in (".parquet", ".feather"):
+        read = pd.read_parquet if extension == ".parquet" else pd.read_feather
+
+        # Problems are stored as ids referencing the problem dimension table
+        dimension = problems_path(base, extension)
+        if columns is not None:
+            import pyarrow.parquet as pq
+            import pyarrow.ipc as ipc
+
+            schema = pq.read_schema(path) if extension == ".parquet" else ipc.open_file(path).schema
+            if "problem" in columns and os.path.exists(dimension):
+                columns = ["problem_id" if c == "problem" else c for c in columns]
+            columns = [c for c in columns if c in schema.names]  # Same as csv, missing columns are skipped
+
+        df = read(path, columns=columns)
+
+        if "problem_id" in df.columns:
+            problems = read(dimension, columns=["problem"])["problem"]
+            df.insert(0, "problem", pd.Categorical.from_codes(df.pop("problem_id"), categories=pd.Index(problems)))
+    elif columns is not None:
+        df = pd.read_csv(path, usecols=lambda column: column in columns, dtype={c: "category" for c in CATEGORICAL_COLUMNS})
+    else:
+        df = pd.read_csv(path, index_col=0, dtype={c: "category" for c in CATEGORICAL_COLUMNS})
+
+    return apply_dtypes(df)
+
+
+############ INCREMENTAL PARSING ############
+
+class ParseCache:
+    """
+    Cache of parsed rows, keyed by the path, mtime and size of each .out file,
+    and of the loaded shards of a result store, keyed the same way
+    Stored as sqlite database beside the output, the rows are stored before cleaning,
+    so the cache stays valid when parsing with different --cut or --remove-filetype options
+    """
+
+    def __init__(self, path: str):
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS rows (path TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER, row TEXT)"
+        )
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS shards (path TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER, frame BLOB)"
+        )
+        self.connection.commit()
+
+    def shards(self, paths: List[str]) -> List[pd.DataFrame]:
+        """
+        Load the given result shards, only new or modified shards are read
+        Closed shards never change, so after a partial re-run only the shards of that run are read
+        Shards that no longer exist are dropped from the cache
+        """
+        frames = []
+        loaded = 0
+
+        for path in paths:
+            stat = os.stat(path)
+            hit = self.connection.execute(
+                "SELECT frame FROM shards WHERE path = ? AND mtime_ns = ? AND size = ?", (path, stat.st_mtime_ns, stat.st_size)
+            ).fetchone()
+
+            frame = None
+            if hit is not None:
+                try:
+                    frame = pickle.loads(hit[0])
+                except Exception:
+                    pass  # Written by another pandas version, read the shard again
+
+            if frame is None:
+                frame = pd.read_json(path, lines=True, dtype=False)
+                self.connection.execute("INSERT OR REPLACE INTO shards VALUES (?, ?, ?, ?)",
+                                        (path, stat.st_mtime_ns, stat.st_size, pickle.dumps(frame)))
+                loaded += 1
+            frames.append(frame)
+
+        self.connection.execute("CREATE TEMP TABLE seen (path TEXT PRIMARY KEY)")
+        self.connection.executemany("INSERT INTO seen VALUES (?)", ((path,) for path in paths))
+        self.connection.execute("DELETE FROM shards WHERE path NOT IN (SELECT path FROM seen)")
+        self.connection.execute("DROP TABLE seen")
+        self.connection.commit()
+
+        print(f"[+]Read {loaded} new or modified shards, {len(paths) - loaded} are cached")
+        return frames
+
+    def rows(self, entries: Iterable[os.DirEntry], workers: int) -> Iterator[Dict[str, Any]]:
+        """
+        Yield the rows of all given files, only new or modified files are parsed
+        Rows of files that no longer exist are dropped from the cache
+        """
+        seen = set()
+        changed = []
+
+        for entry in entries:
+            stat = entry.stat()
+            seen.add(entry.path)
+
+            hit = self.connection.execute(
+                "SELECT row FROM rows WHERE path = ? AND mtime_ns = ? AND size = ?", (entry.path, stat.st_mtime_ns, stat.st_size)
+            ).fetchone()
+
+            if hit is None:
+                changed.append((entry.path, stat.st_mtime_ns, stat.st_size))
+            elif (row := json.loads(hit[0])) is not None:
+                yield row
+
+        print(f"[+]Parsing {len(changed)} new or modified files, {len(seen) - len(changed)} are cached")
+
+        if changed:
+            with Pool(workers) as pool:
+                parsed = pool.imap(parse_row, [path for path, _, _ in changed], chunksize=64)
+                for (path, mtime_ns, size), row in zip(changed, parsed):
+                    # Unparsable files are cached as well, so they are not parsed again
+                    self.connection.execute("INSERT OR REPLACE INTO rows VALUES (?, ?, ?, ?)", (path, mtime_ns, size, json.dumps(row)))
+                    if row is not None:
+                        yield row
+
+        self.connection.execute("CREATE TEMP TABLE seen (path TEXT PRIMARY KEY)")
+        self.connection.executemany("INSERT INTO seen VALUES (?)", ((path,) for path in seen))
+        deleted = self.connection.execute("DELETE FROM rows WHERE path NOT IN (SELECT path FROM seen)").rowcount
+        self.connection.execute("DROP TABLE seen")
+        self.connection.commit()
+
+        if deleted:
+            print(f"[+]Dropped {deleted} deleted files from the cache")
+
+    def close(self):
+        self.connection.close()
+
+
+def data_rows(args) -> Iterator[Dict[str, Any]]:
+    """
+    All rows of a tree of .out files, parsed in parallel and incrementally if requested
+    """
+    if not args.incremental:
+        yield from iter_rows(iter_out_files(args.path), args.workers)
+        return
+
+    cache = ParseCache(f"{args.output}{CACHE_SUFFIX}")
+    try:
+        yield from cache.rows(iter_out_entries(args.path), args.workers)
+    finally:
+        cache.close()
+
+
+def stream_data(args) -> Iterator[pd.DataFrame]:
+    """
+    Parse a tree of .out files in parallel and yield the cleaned result in chunks
+    A result store is loaded as a whole, since reruns of a job replace its earlier results, and then written in chunks
+    """
+    if os.path.isdir(os.path.join(args.path, RESULTS_DIR)):
+        df = store_data(args)
+        if df is None:
+            return
+        df = apply_dtypes(clean_df(df, cut=args.cut, remove_filetype=args.remove_filetype))
+        for start in range(0, len(df), args.chunk_size):
+            yield df.iloc[start:start + args.chunk_size]
+        return
+
+    rows = data_rows(args)
+    for chunk in iter_chunks(rows, args.chunk_size):
+        yield apply_dtypes(clean_df(chunk, cut=args.cut, remove_filetype=args.remove_filetype))
+
+
+def share_aliased_results(df: pd.DataFrame, aliases_path: str) -> pd.DataFrame:
+    """
+    Copy the results of deduplicated benchmarks to all benchmarks with the same content
+    Results measured for a benchmark itself take precedence over shared ones
+    """
+    aliases = pd.DataFrame(list(iter_records(aliases_path)), columns=["problem", "alias_of", "solver"])
+    if aliases.empty:
+        return df
+
+    aliases = aliases.rename(columns={"problem": "alias"}).drop_duplicates(["alias", "solver"], keep="last")
+    for_all = aliases[aliases["solver"].isna()].drop(columns="solver")
+    for_solver = aliases[aliases["solver"].notna()]
+
+    shared = pd.concat([
+        df.merge(for_all, left_on="problem", right_on="alias_of"),
+        df.merge(for_solver, left_on=["problem", "solver"], right_on=["alias_of", "solver"]),
+    ], ignore_index=True)
+    shared = shared.assign(problem=shared["alias"]).drop(columns=["alias", "alias_of"])
+    print(f"[+]Sharing {len(shared)} results with deduplicated benchmarks")
+
+    return pd.concat([shared, df], ignore_index=True).drop_duplicates(["problem", "solver"], keep="last")
+
+
+def store_data(args) -> pd.DataFrame | None:
+    """
+    Load the result store of the runner, incrementally if requested
+    """
+    if not args.incremental:
+        return parse_store(args.path)
+
+    cache = ParseCache(f"{args.output}{CACHE_SUFFIX}")
+    try:
+        return parse_store(args.path, cache)
+    finally:
+        cache.close()
+
+
+def parse_store(path: str, cache: ParseCache | None = None) -> pd.DataFrame | None:
+    """
+    Load the result store written by the runner into a dataframe
+    :param path The output directory of the runner, containing the results directory
+    :param cache Only read shards that are new or changed since the last load with this cache
+    The problem names are prefixed with the given path, matching the names parsed from the legacy .out files
+    :returns None if the results directory holds no shards
+    """
+    shards = shard_paths(os.path.join(path, RESULTS_DIR))
+    print(f"[+]Loading {len(shards)} result shards")
+    if not shards:
+        return None
+
+    frames = cache.shards(shards) if cache is not None else [pd.read_json(shard, lines=True, dtype=False) for shard in shards]
+    df = pd.concat(frames, ignore_index=True)
+
+    # A job that was run again (eg. after --resume) replaces its earlier results
+    df = df.sort_values("time", kind="stable").drop_duplicates(["problem", "solver"], keep="last")
+    df = share_aliased_results(df, os.path.join(path, RESULTS_DIR, ALIASES_DIR))
+
+    root = os.path.normpath(path)
+    df["problem"] = [os.path.join(root, os.path.splitext(problem)[0]) for problem in df["problem"]]
+
+    # The analysis is based on task-clock:u, for the rusage backend this is the user time in msec
+    if "user_time" in df.columns:
+        user_clock = df["user_time"] * 1000
+        df["task-clock:u"] = df["task-clock:u"].fillna(user_clock) if "task-clock:u" in df.columns else user_clock
+
+    # Runs stopped early by a race only give a lower bound of their time
+    if "censored" in df.columns:
+        df["censored"] = df["censored"].fillna(False).astype(bool)
+
+    df = df.rename(columns={"answer": "sanity_sat"})
+    return df.drop(columns=[c for c in STORE_ONLY_COLUMNS if c in df.columns]).reset_index(drop=True)
 
 
 ############ TAG PARSING ############
 
-def parse_tagfile(file_path: str, directory: str, base_tags: Set[str]) -> Tuple[Dict[str, List[str]], Set[str]]:
+def read_tagfile(file_path: str, directory: str, inherited: FrozenSet[str]) -> Tuple[FrozenSet[str], Dict[str, FrozenSet[str]]]:
     """
-    Tag all files in a directory with the given tagfile
+    Resolve the tags of a tagfile
     :param file_path The path of the tagfile
-    :param directory The directory to tag
-    :base_tags The tags to apply on every file
-    :returns A tuple containing, all files in a directory with their tags, a set of tags that apply at the given path
+    :param directory The directory the tagfile is in
+    :param inherited The tags inherited from the parent directories
+    :returns A tuple containing, the tags that apply at the given path, the files with customized tags
     """
-    tags = None
     with open(file_path, "r") as f:
         tags = json.load(f)
 
-    files_with_tags = {}
-    all_tags = set(base_tags)
+    # Resolved once per tagfile, the same frozenset is shared by all files of the directory and its subdirectories
+    resolved = inherited | frozenset(tags.get("add", []))
 
-    add_tags = set(tags.get("add", []))
-    all_tags.update(add_tags)
+    customized = {}
+    for custom in tags.get("customize", []):
+        for filepath, custom_tags in custom.items():
+            customized[os.path.join(directory, filepath)] = frozenset(custom_tags)
 
-    files = [
-        os.path.join(directory, f) for f in os.listdir(directory) if os.path.isfile(os.path.join(directory, f)) and f != "tags.json"
-    ]
+    return resolved, customized
 
-    for file_path in files:
-        files_with_tags[file_path] = all_tags
 
-    for custom in tags.get("customize", []):
-        for filepath, custom_tags in custom.items():
-            full_path = os.path.join(directory, filepath)
-            files_with_tags[full_path] = set(custom_tags)
+def iter_tags(directory: str, inherited: FrozenSet[str] = frozenset(), stamps: Dict[str, int] | None = None) -> Iterator[Tuple[str, FrozenSet[str]]]:
+    """
+    Recursively yield all files in the directory and all subdirs with their tags
+    Every directory is listed exactly once, the file types come from the listing without extra stat calls
+    :param stamps If given, the mtimes of all visited directories and tagfiles are collected into it
+    """
+    files = []
+    dirs = []
+    tagfile = None
+
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_dir():
+                dirs.append(entry.path)
+            elif entry.is_file():
+                if entry.name == TAGFILE:
+                    tagfile = entry.path
+                else:
+                    files.append(entry.path)
+
+    if stamps is not None:
+        stamps[directory] = os.stat(directory).st_mtime_ns
+        if tagfile:
+            stamps[tagfile] = os.stat(tagfile).st_mtime_ns
+
+    tags: FrozenSet[str] = inherited
+    customized: Dict[str, FrozenSet[str]] = {}
+    if tagfile:
+        tags, customized = read_tagfile(tagfile, directory, inherited)
+
+    for file in files:
+        yield file, customized.pop(file, tags)
+
+    # Customizations of files that don't exist are kept, files in subdirectories are tagged by their own directory
+    for file, custom_tags in customized.items():
+        if not os.path.isfile(file):
+            yield file, custom_tags
 
-    return {file: list(tags) for file, tags in files_with_tags.items()}, all_tags
+    for dir in dirs:
+        yield from iter_tags(dir, tags, stamps)
 
 
-def tag_directory(directory, tags=set()) -> Dict[str, List[str]]:
+def tag_directory(directory, tags=frozenset()) -> Dict[str, List[str]]:
     """
     Recursively tag all files in the directory and all subdirs
     """
+    return {file: list(file_tags) for file, file_tags in iter_tags(directory, frozenset(tags))}
 
-    dirs = []
-    tags = tags.copy()
-    found_tagfile = False
-    taged_files: Dict[str, List[str]] = {}
-    files = []
-    for item in os.listdir(directory):
-        full_path = os.path.join(directory, item)
 
-        if os.path.isfile(full_path):
-            if os.path.basename(full_path) == "tags.json":
-                taged_files, tags = parse_tagfile(full_path, directory, tags)
-                found_tagfile = True
-            else:
-                files.append(full_path)
+class TagCache:
+    """
+    Cache of the resolved (problem, tag) rows of a directory
+    The cache is valid as long as the mtimes of all directories and tagfiles are unchanged,
+    adding or removing files or tagfiles changes the mtime of their directory
+    """
 
-        if os.path.isdir(full_path):
-            dirs.append(full_path)
+    def __init__(self, path: str):
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS tag_root (path TEXT)")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS tag_stamps (path TEXT PRIMARY KEY, mtime_ns INTEGER)")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS tag_rows (problem TEXT, tag TEXT)")
+        self.connection.commit()
 
-    if not found_tagfile:
-        taged_files = {file: list(tags) for file in files}
+    def valid(self, directory: str) -> bool:
+        root = self.connection.execute("SELECT path FROM tag_root").fetchone()
+        if root is None or root[0] != directory:
+            return False
 
-    for dir in dirs:
-        taged_files.update(tag_directory(dir, tags))
+        for path, mtime_ns in self.connection.execute("SELECT path, mtime_ns FROM tag_stamps"):
+            try:
+                if os.stat(path).st_mtime_ns != mtime_ns:
+                    return False
+            except FileNotFoundError:
+                return False
+
+        return True
+
+    def rows(self) -> Iterator[Tuple[str, str]]:
+        yield from self.connection.execute("SELECT problem, tag FROM tag_rows")
 
-    return taged_files
+    def resolve(self, directory: str) -> Iterator[Tuple[str, str]]:
+        """
+        Walk the directory and yield its rows, the cache is only replaced once the walk is complete
+        """
+        for table in ("tag_root", "tag_stamps", "tag_rows"):
+            self.connection.execute(f"DELETE FROM {table}")
+
+        stamps: Dict[str, int] = {}
+        for file, tags in iter_tags(directory, stamps=stamps):
+            for tag in tags:
+                self.connection.execute("INSERT INTO tag_rows VALUES (?, ?)", (file, tag))
+                yield (file, tag)
+
+        self.connection.execute("INSERT INTO tag_root VALUES (?)", (directory,))
+        self.connection.executemany("INSERT INTO tag_stamps VALUES (?, ?)", stamps.items())
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+
+def tag_rows(directory: str, cache_path: str | None = None) -> Iterator[Tuple[str, str]]:
+    """
+    Stream the (problem, tag) rows of all files in the directory
+    :param cache_path If given, the rows are cached and only resolved again when a directory or tagfile changed
+    """
+    if cache_path is None:
+        for file, tags in iter_tags(directory):
+            for tag in tags:
+                yield (file, tag)
+        return
+
+    cache = TagCache(cache_path)
+    try:
+        if cache.valid(directory):
+            print("[+]Tags unchanged, using cached tags")
+            yield from cache.rows()
+        else:
+            yield from cache.resolve(directory)
+    finally:
+        cache.close()
 
 
 def enrich_with_folders(df, cut=4):
@@ -239,23 +747,72 @@ def clean_df(df, cut=2, remove_filetype=True, column="problem"):
         return cleaned
 
     # Apply the cleaning function to the specified column
-    df[column] = df[column].apply(clean_path)
+    if isinstance(df[column].dtype, pd.CategoricalDtype):
+        df[column] = df[column].map(clean_path).astype("category")  # Only cleans each category once
+    else:
+        df[column] = df[column].apply(clean_path)
     return df
 
 
-def parse_data(args):
+def parse_data(args) -> pd.DataFrame | None:
+    """
+    :returns None if no results were found
+    """
+    if os.path.isdir(os.path.join(args.path, RESULTS_DIR)):
+        df = store_data(args)
+        if df is None:
+            return None
+        return apply_dtypes(clean_df(df, cut=args.cut, remove_filetype=args.remove_filetype))
+
+    # Legacy output of the runner, one .out file per problem and solver
+    if args.incremental:
+        df = pd.DataFrame(list(data_rows(args)))
+        return apply_dtypes(clean_df(df, cut=args.cut, remove_filetype=args.remove_filetype))
+
     files = [str(file) for file in Path(args.path).rglob("*.out")]
+    if not files:
+        return None
     df = parse_files(files)
     cleaned = clean_df(df, cut=args.cut, remove_filetype=args.remove_filetype)
 
-    return cleaned
+    return apply_dtypes(cleaned)
+
+
+def scanned_tag_rows(directory: str, workers: int, stats: List[Dict[str, Any]]) -> Iterator[Tuple[str, str]]:
+    """
+    Stream the (problem, tag) rows of all files in the directory, additionally tagging every smt2 file
+    with the operators it uses, the files are scanned across a pool of processes
+    :param stats The size statistics of every scanned file are appended to this list
+    """
+    with Pool(workers) as pool:
+        for file, tags, file_stats in pool.imap(scan_entry, iter_tags(directory), chunksize=32):
+            if file_stats is not None:
+                stats.append({"problem": file, **file_stats})
+            for tag in tags:
+                yield (file, tag)
+
+
+def stream_tags(args, stats: List[Dict[str, Any]] | None = None) -> Iterator[pd.DataFrame]:
+    """
+    Resolve the tags of a directory and yield the cleaned (problem, tags) rows in chunks
+    :param stats If given, smt2 files are scanned for their operators, and their statistics are appended to it
+    """
+    if stats is not None:
+        # File contents don't change the mtimes the tag cache is based on, so scanning never uses it
+        rows = scanned_tag_rows(args.path, args.workers, stats)
+    else:
+        rows = tag_rows(args.path, f"{args.output}{CACHE_SUFFIX}" if args.incremental else None)
+
+    while chunk := list(islice(rows, args.chunk_size)):
+        df = pd.DataFrame(chunk, columns=["problem", "tags"])
+        yield apply_dtypes(clean_df(df, cut=args.cut, remove_filetype=args.remove_filetype))
 
 
 def parse_tags(args):
-    taged = tag_directory(args.path)
-    df = tags_to_df(taged)
-    cleaned = clean_df(df, cut=args.cut, remove_filetype=args.remove_filetype)
-    return cleaned
+    chunks = list(stream_tags(args))
+    if not chunks:
+        return pd.DataFrame(columns=["problem", "tags"])
+    return apply_dtypes(pd.concat([chunk.astype(str) for chunk in chunks], ignore_index=True))
 
 
 if __name__ == "__main__":
@@ -271,12 +828,33 @@ if __name__ == "__main__":
     )
     parser.add_argument("--cut", type=int, default=2, help="Number of directories to remove from the start of the paths (default: 2), only applicable if mode is set to tags")
     parser.add_argument("--remove-filetype", action="store_true", help="Remove the file extension from paths (default: False), only applicable if mode is set to tags")
+    parser.add_argument("--format", type=str, choices=["csv", "parquet", "feather"], default="csv", help="The format to store the dataframe in (default: csv), parquet and feather are typed and compressed and require pyarrow")
+    parser.add_argument("--stream", action="store_true", help="Parse .out files in parallel and write the result in chunks, keeping the memory usage flat, only applicable if mode is set to data")
+    parser.add_argument("--incremental", action="store_true", help=f"Only parse .out files(or result shards) that are new or changed since the last run, in tags mode only resolve the tags again if a directory or tagfile changed, using a cache stored as <output>{CACHE_SUFFIX}")
+    parser.add_argument("--scan", action="store_true", help=f"Additionally tag every smt2 file with the string and regex operators it uses, and store size statistics as <output>{STATS_SUFFIX}, only applicable if mode is set to tags")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Number of processes used with --stream and --scan (default: number of cores)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help=f"Number of rows per written chunk with --stream (default: {CHUNK_SIZE})")
     args = parser.parse_args()
 
-    df = None
-    if args.mode == "data":
-        df = parse_data(args)
-    else:
-        df = parse_tags(args)
-
-    df.to_csv(f"{args.output}.csv")
+    no_results = f"No results found in {args.path}, expected .out files or a {RESULTS_DIR} directory written by the runner"
+    if args.mode == "data" and args.stream:
+        if write_chunks(stream_data(args), args.output, args.format) == 0:
+            print(no_results)
+            sys.exit(1)
+        sys.exit(0)
+
+    if args.mode == "tags":
+        stats = [] if args.scan else None
+        write_chunks(stream_tags(args, stats), args.output, args.format)
+
+        if stats is not None:
+            print(f"[+]Writing statistics of {len(stats)} scanned files")
+            stats_df = pd.DataFrame(stats, columns=["problem", *STAT_NAMES])
+            write_chunks([apply_dtypes(clean_df(stats_df, cut=args.cut, remove_filetype=args.remove_filetype))], f"{args.output}{STATS_SUFFIX}", args.format)
+        sys.exit(0)
+
+    df = parse_data(args)
+    if df is None or df.empty:
+        print(no_results)
+        sys.exit(1)
+    write_chunks([df], args.output, args.format)
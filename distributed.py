@@ -0,0 +1,353 @@
+import hashlib
+import hmac
+import ipaddress
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple
+
+from ledger import Ledger
+from placement import avoid, core_sets, pin
+from progress import Progress
+from results import Error
+
+# The coordinator hands out jobs to workers over a stream socket(TCP or unix), one JSON message per line
+# worker -> coordinator: {"type": "hello", "worker": name, "token": shared token}, {"type": "request"}, {"type": "heartbeat"},
+#                        {"type": "result", "id": job id, "record": result record, "success": bool}
+# coordinator -> worker: {"type": "job", "id": job id, "solver": name, "config": hash of the command, "file": path},
+#                        {"type": "wait"} if all remaining jobs are in flight, {"type": "done"} once all jobs finished,
+#                        {"type": "denied"} if the token is wrong
+# Every job slot of a worker has its own connection, jobs in flight on a connection that is closed
+# or did not send a heartbeat for HEARTBEAT_TIMEOUT seconds are handed out again
+# Workers never run commands sent over the socket, they look up the solver in their own config and only run it
+# if it has the same command as on the coordinator. Listening on anything but localhost or a unix socket requires a token
+
+HEARTBEAT_INTERVAL = 5  # Seconds between heartbeats of a worker
+HEARTBEAT_TIMEOUT = 30  # Seconds without heartbeat after which a worker is considered dead
+WAIT_INTERVAL = 1  # Seconds a worker waits before asking again, if all remaining jobs are in flight
+RECONNECT_ATTEMPTS = 5
+
+Job = Tuple[str, List[str], str]  # (solver name, solver command, input file)
+
+
+def parse_address(address: str) -> Tuple[int, Any]:
+    """
+    Parse "unix:/path/to/socket" or "host:port", the host defaults to localhost
+    :returns The socket family and the address in the format of that family
+    """
+    if address.startswith("unix:"):
+        return socket.AF_UNIX, address[len("unix:"):]
+
+    host, _, port = address.rpartition(":")
+    return socket.AF_INET, (host or "127.0.0.1", int(port))
+
+
+def is_local(host: str) -> bool:
+    try:
+        return host == "localhost" or ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def command_hash(command: List[str]) -> str:
+    return hashlib.sha256(json.dumps(command).encode("utf-8")).hexdigest()
+
+
+def send(stream, message: Dict[str, Any]):
+    stream.write(json.dumps(message).encode("utf-8") + b"\n")
+    stream.flush()
+
+
+def receive(stream) -> Dict[str, Any] | None:
+    line = stream.readline()
+    return json.loads(line) if line else None
+
+
+class JobQueue:
+    """
+    Thread safe source of jobs for the coordinator, jobs of dead workers are handed out again before new ones
+    """
+
+    def __init__(self, jobs: Iterable[Job], ledger: Ledger, unreadable: Callable[[Job, OSError], None] | None = None):
+        """
+        :param unreadable Called with jobs whose benchmark can not be hashed(eg. a broken symlink), they are not handed out
+        """
+        self.jobs: Iterator[Job] = iter(jobs)
+        self.ledger = ledger
+        self.unreadable = unreadable
+        self.requeued: deque = deque()
+        self.in_flight: Dict[int, Job] = {}
+        self.hashing = 0  # Jobs taken from the queue whose benchmark is still being hashed
+        self.next_id = 0
+        self.exhausted = False
+        self.lock = threading.Lock()
+        self.finished = threading.Event()
+
+    def take(self) -> Tuple[str, int, Job | None]:
+        """
+        :returns ("job", id, job), ("wait", -1, None) if all remaining jobs are in flight, or ("done", -1, None)
+        """
+        while True:
+            with self.lock:
+                if self.requeued:
+                    job = self.requeued.popleft()
+                else:
+                    job = None if self.exhausted else next(self.jobs, None)
+                    if job is None:
+                        self.exhausted = True
+                        if self.in_flight or self.hashing:
+                            return ("wait", -1, None)
+                        self.finished.set()
+                        return ("done", -1, None)
+                self.hashing += 1
+
+            # Hashed outside the lock, so other workers are not blocked by large benchmarks
+            try:
+                key = self.ledger.key(*job)
+            except OSError as e:
+                print(f"Some Exception occured: {e}")
+                if self.unreadable is not None:
+                    self.unreadable(job, e)
+                with self.lock:
+                    self.hashing -= 1
+                self._check_finished()
+                continue
+
+            with self.lock:
+                self.hashing -= 1
+                job_id = self.next_id
+                self.next_id += 1
+                self.in_flight[job_id] = job
+
+            self.ledger.start(key, job[2])
+            return ("job", job_id, job)
+
+    def finish(self, job_id: int, success: bool) -> bool:
+        """
+        :returns If the job was still in flight, results of jobs that were already handed out again are dropped
+        """
+        with self.lock:
+            job = self.in_flight.pop(job_id, None)
+        if job is None:
+            return False
+
+        self.ledger.finish(self.ledger.key(*job), job[2], success)
+        self._check_finished()
+        return True
+
+    def requeue(self, job_ids: Iterable[int]):
+        with self.lock:
+            for job_id in job_ids:
+                job = self.in_flight.pop(job_id, None)
+                if job is not None:
+                    self.requeued.append(job)
+
+    def _check_finished(self):
+        with self.lock:
+            if self.exhausted and not self.in_flight and not self.requeued and not self.hashing:
+                self.finished.set()
+
+
+def serve(address: str, jobs: Iterable[Job], ledger: Ledger, store_record: Callable[[Dict], bool],
+          progress: Progress | None = None, token: str | None = None):
+    """
+    Run the coordinator, hand out the jobs to the connecting workers until all of them are finished
+    The results the workers send back are written with store_record
+    :param progress Tracks the utilisation of every job slot of the workers
+    :param token Shared secret every worker has to send, required unless listening on localhost or a unix socket
+    :raises ValueError If listening on a public address without token
+    """
+    family, bind_address = parse_address(address)
+    if family == socket.AF_INET and not is_local(bind_address[0]) and not token:
+        raise ValueError(f"Listening on {bind_address[0]} requires a token shared with the workers")
+
+    def unreadable(job: Job, error: OSError):
+        solver, _, input_file = job
+        store_record({"problem": input_file, "solver": solver, "status": Error, "answer": None, "returncode": 3, "stderr_tail": str(error)})
+
+    queue = JobQueue(jobs, ledger, unreadable)
+    connections: Dict[socket.socket, float] = {}  # Last sign of life of every connection
+    lock = threading.Lock()
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            name = "unknown"
+            assigned: List[int] = []
+            authenticated = not token
+            with lock:
+                connections[self.request] = time.monotonic()
+
+            try:
+                while (message := receive(self.rfile)) is not None:
+                    with lock:
+                        connections[self.request] = time.monotonic()
+
+                    if message["type"] == "hello":
+                        name = message["worker"]
+                        authenticated = not token or hmac.compare_digest(str(message.get("token") or "").encode("utf-8"), token.encode("utf-8"))
+                        if not authenticated:
+                            print(f"[+] Rejected worker {name}, wrong token")
+                            send(self.wfile, {"type": "denied"})
+                            return
+                    elif not authenticated:
+                        return  # Everything else requires a hello with the token first
+                    elif message["type"] == "request":
+                        kind, job_id, job = queue.take()
+                        if job is None:
+                            send(self.wfile, {"type": kind})
+                            continue
+
+                        assigned.append(job_id)
+                        solver, command, input_file = job
+                        if progress is not None:
+                            progress.job_started(name, solver, input_file)
+                        send(self.wfile, {"type": "job", "id": job_id, "solver": solver, "config": command_hash(command), "file": input_file})
+                    elif message["type"] == "result":
+                        job_id = message["id"]
+                        if job_id in assigned:
+                            assigned.remove(job_id)
+                            recorded = message["record"] is not None and store_record(message["record"])
+                            queue.finish(job_id, recorded and message["success"])
+                            if progress is not None:
+                                progress.job_finished(name)
+            except (OSError, ValueError) as e:
+                print(f"[+] Lost worker {name}: {e}")
+            finally:
+                with lock:
+                    connections.pop(self.request, None)
+                if assigned:
+                    print(f"[+] Requeueing {len(assigned)} jobs of worker {name}")
+                    queue.requeue(assigned)
+                    if progress is not None:
+                        progress.job_finished(name)
+
+    base = socketserver.ThreadingUnixStreamServer if family == socket.AF_UNIX else socketserver.ThreadingTCPServer
+
+    class Server(base):  # type: ignore # (Base chosen at runtime)
+        daemon_threads = True
+        allow_reuse_address = True
+
+    if family == socket.AF_UNIX and os.path.exists(bind_address):
+        os.unlink(bind_address)
+
+    with Server(bind_address, Handler) as server:
+        print(f"[+] Coordinator listening on {address}")
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        # Close connections without heartbeat, their handler requeues the jobs
+        while not queue.finished.wait(HEARTBEAT_INTERVAL):
+            now = time.monotonic()
+            with lock:
+                stale = [connection for connection, seen in connections.items() if now - seen > HEARTBEAT_TIMEOUT]
+            for connection in stale:
+                print("[+] A worker missed its heartbeats, closing its connection")
+                try:
+                    connection.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+
+        # Keep answering for a moment, so workers waiting for the last jobs are told that they are done
+        time.sleep(2 * WAIT_INTERVAL)
+        server.shutdown()
+
+    if family == socket.AF_UNIX and os.path.exists(bind_address):
+        os.unlink(bind_address)
+    print("[+] All jobs finished")
+
+
+def work_slot(address: str, name: str, run_job: Callable[..., Tuple[Dict | None, bool]], solvers: Dict[str, List[str]],
+              cores=None, token: str | None = None):
+    """
+    Pull jobs from the coordinator and run them one after another, until the coordinator has no jobs left
+    :param solvers The local config, jobs of solvers missing from it or configured differently than on the coordinator are not run
+    """
+    pin(cores)
+    family, connect_address = parse_address(address)
+
+    attempts = 0
+    while attempts < RECONNECT_ATTEMPTS:
+        try:
+            with socket.socket(family, socket.SOCK_STREAM) as connection:
+                connection.connect(connect_address)
+                stream = connection.makefile("rwb")
+                send_lock = threading.Lock()
+                stop = threading.Event()
+                attempts = 0
+
+                def locked_send(message: Dict[str, Any]):
+                    with send_lock:
+                        send(stream, message)
+
+                def heartbeat():
+                    while not stop.wait(HEARTBEAT_INTERVAL):
+                        try:
+                            locked_send({"type": "heartbeat"})
+                        except OSError:
+                            return
+
+                threading.Thread(target=heartbeat, daemon=True).start()
+                try:
+                    locked_send({"type": "hello", "worker": name, "token": token})
+                    while True:
+                        locked_send({"type": "request"})
+                        message = receive(stream)
+                        if message is None:
+                            raise ConnectionError("Coordinator closed the connection")
+
+                        if message["type"] == "done":
+                            return
+                        if message["type"] == "denied":
+                            print("[+] The coordinator rejected the token")
+                            return
+                        if message["type"] == "wait":
+                            time.sleep(WAIT_INTERVAL)
+                            continue
+
+                        command = solvers.get(message["solver"])
+                        if command is None or command_hash(command) != message["config"]:
+                            print(f"[+] Not running {message['solver']}, it is missing from the local config or configured differently")
+                            record, success = None, False
+                        else:
+                            record, success = run_job(message["solver"], command, message["file"])
+                        locked_send({"type": "result", "id": message["id"], "record": record, "success": success})
+                finally:
+                    stop.set()
+
+        except OSError as e:
+            attempts += 1
+            print(f"[+] Connection to the coordinator failed({e}), retrying")
+            time.sleep(WAIT_INTERVAL * attempts)
+
+    print("[+] Giving up, the coordinator is not reachable")
+
+
+def work(address: str, n_slots: int, run_job: Callable[..., Tuple[Dict | None, bool]], solvers: Dict[str, List[str]],
+         pinned: bool = False, token: str | None = None, cores_per_job: int = 1, avoid_smt: bool = False):
+    """
+    Run a worker with n_slots parallel job slots, each slot has its own connection to the coordinator
+    :param solvers The local config, the coordinator only names the solver of a job
+    :param cores_per_job With pinned, the number of dedicated cores of every slot
+    :param avoid_smt With pinned, only use one hyperthread of every physical core
+    """
+    name = f"{socket.gethostname()}-{os.getpid()}"
+    placements = core_sets(n_slots, cores_per_job, avoid_smt) if pinned else []
+    if pinned:
+        if not placements:
+            print(f"Not enough cpus to give each job {cores_per_job} dedicated cores")
+            return
+        if len(placements) < n_slots:
+            print(f"[+] Only enough cpus for {len(placements)} pinned job slots")
+        n_slots = len(placements)
+        avoid(placements)
+
+    print(f"[+] Worker {name} running {n_slots} jobs in parallel for {address}")
+    threads = [threading.Thread(target=work_slot, args=(address, f"{name}-{i}", run_job, solvers, placements[i] if pinned else None, token))
+               for i in range(n_slots)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
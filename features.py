@@ -0,0 +1,103 @@
+import hashlib
+import mmap
+import os
+import re
+from typing import Dict, FrozenSet, Set, Tuple
+
+# One token of an smt2 file: parentheses, comments, string literals, quoted symbols or plain symbols
+TOKEN = re.compile(rb'\(|\)|;[^\n]*|"(?:[^"]|"")*"|\|[^|]*\||[^\s()";|]+')
+
+# Every symbol with one of these prefixes is reported as feature, eg. str.replace_re, str.to_int, re.*, str.len
+FEATURE_PREFIXES = (b"str.", b"re.")
+FEATURE_SYMBOLS = {b"int.to.str"}  # Old name of str.from_int
+
+DECLARATIONS = {b"declare-fun", b"declare-const"}
+
+STAT_NAMES = ["size", "tokens", "asserts", "variables", "depth"]
+
+
+def scan_file(path: str) -> Tuple[Set[str], Dict[str, int]]:
+    """
+    Scan an smt2 file for the string and regex operators it uses and its size
+    The file is memory mapped and tokenized with a bytes regex, it is never decoded into a python string
+    :returns The used operators, and the statistics: file size, token count, assert count,
+             number of declared variables(constants and functions) and the maximal term depth
+    """
+    size = os.path.getsize(path)
+    operators: Set[str] = set()
+    tokens = asserts = variables = 0
+    depth = max_depth = 0
+    head = False  # If the current token is the first one after an opening parenthesis
+
+    if size > 0:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            for match in TOKEN.finditer(data):  # type: ignore # (mmap supports the buffer protocol)
+                token = match.group()
+
+                if token == b"(":
+                    depth += 1
+                    max_depth = max(max_depth, depth)
+                    head = True
+                    continue
+
+                if token == b")":
+                    depth -= 1
+                    head = False
+                    continue
+
+                if token[0] in b';"':  # Comments and string literals
+                    head = False
+                    continue
+
+                tokens += 1
+                if head:
+                    if token == b"assert":
+                        asserts += 1
+                    elif token in DECLARATIONS:
+                        variables += 1
+                    head = False
+
+                if token.startswith(FEATURE_PREFIXES) or token in FEATURE_SYMBOLS:
+                    operators.add(token.decode("utf-8", errors="replace"))
+
+    # The outermost parenthesis belongs to the command, not the term
+    stats = {"size": size, "tokens": tokens, "asserts": asserts, "variables": variables, "depth": max(max_depth - 1, 0)}
+
+    return operators, stats
+
+
+def canonical_hash(path: str) -> str:
+    """
+    Hash the tokens of an smt2 file, files that only differ in whitespace or comments have the same hash
+    """
+    digest = hashlib.sha256()
+
+    if os.path.getsize(path) > 0:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            for match in TOKEN.finditer(data):  # type: ignore # (mmap supports the buffer protocol)
+                token = match.group()
+                if token[0] != ord(";"):
+                    digest.update(token)
+                    digest.update(b" ")
+
+    return digest.hexdigest()
+
+
+def scan_entry(entry: Tuple[str, FrozenSet[str]]) -> Tuple[str, FrozenSet[str], Dict[str, int] | None]:
+    """
+    Add the operators used in an smt2 file to its tags, other files are passed through
+    :returns The file, its tags and the statistics of the file if it was scanned
+    """
+    file, tags = entry
+    if not file.endswith(".smt2"):
+        return file, tags, None
+
+    try:
+        operators, stats = scan_file(file)
+    except FileNotFoundError:
+        return file, tags, None  # Customized tags of a file that doesn't exist
+    except OSError as e:
+        print(f"Error {e} while scanning file {file}")
+        return file, tags, None
+
+    return file, tags | operators, stats
@@ -0,0 +1,123 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
+
+# Job states stored in the ledger
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+LedgerKey = Tuple[str, str, str]  # (solver name, config hash, benchmark content hash)
+
+
+@lru_cache(maxsize=4096)
+def content_hash(path: str) -> str:
+    """
+    Hash the content of a benchmark file, cached since every file is used by several solver jobs
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def config_hash(command: List[str], timeout: float, memory_limit: int | None = None) -> str:
+    """
+    Hash everything that influences the result of a solver run besides the benchmark itself
+    """
+    config = [command, timeout] if memory_limit is None else [command, timeout, memory_limit]
+    return hashlib.sha256(json.dumps(config).encode("utf-8")).hexdigest()
+
+
+class Ledger:
+    """
+    A persistent record of all jobs the runner started and finished, stored as sqlite database
+    Jobs are keyed by (solver, config hash, benchmark content hash), so changing a solvers config
+    or a benchmark invalidates the old entries
+    :param hash_file The function used to hash the benchmarks, eg. features.canonical_hash to ignore whitespace and comments
+    :param memory_limit The memory limit of the runs in KiB, part of the config hash
+    """
+
+    def __init__(self, path: str, timeout: float, hash_file: Callable[[str], str] = content_hash, memory_limit: int | None = None):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.timeout = timeout
+        self.memory_limit = memory_limit
+        self.hash_file = hash_file
+        self.hashes: Dict[str, str] = {}  # Precomputed hashes of benchmarks, eg. by the deduplication
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            """CREATE TABLE IF NOT EXISTS jobs (
+                solver TEXT NOT NULL,
+                config_hash TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                path TEXT NOT NULL,
+                status TEXT NOT NULL,
+                updated REAL NOT NULL,
+                PRIMARY KEY (solver, config_hash, content_hash)
+            )"""
+        )
+        self.connection.commit()
+
+    def key(self, solver: str, command: List[str], input_file: str) -> LedgerKey:
+        file_hash = self.hashes.get(input_file) or self.hash_file(input_file)
+        return (solver, config_hash(command, self.timeout, self.memory_limit), file_hash)
+
+    def _set(self, key: LedgerKey, path: str, status: str):
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?, ?, ?)",
+                (*key, path, status, time.time()),
+            )
+            self.connection.commit()
+
+    def start(self, key: LedgerKey, path: str):
+        self._set(key, path, RUNNING)
+
+    def finish(self, key: LedgerKey, path: str, success: bool):
+        self._set(key, path, DONE if success else FAILED)
+
+    def entry(self, key: LedgerKey) -> Tuple[str, str] | None:
+        """
+        :returns The status and the benchmark path of the last run of a job
+        """
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT status, path FROM jobs WHERE solver = ? AND config_hash = ? AND content_hash = ?", key
+            ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def status(self, key: LedgerKey) -> str | None:
+        entry = self.entry(key)
+        return entry[0] if entry else None
+
+    def pending(self,
+                jobs: Iterable[Tuple[str, List[str], str]],
+                measured_elsewhere: Callable[[Tuple[str, List[str], str], str], None] | None = None) -> Iterator[Tuple[str, List[str], str]]:
+        """
+        Filter out all jobs that already finished successfully
+        Missing, failed and stale jobs(still marked as running from a crashed run) are kept
+        :param measured_elsewhere Called with the job and the path the benchmark was measured at,
+                                  for finished jobs whose benchmark was measured under another path
+        """
+        for job in jobs:
+            try:
+                entry = self.entry(self.key(*job))
+            except OSError:
+                yield job  # Unreadable benchmark, left to the worker to report
+                continue
+            if entry is None or entry[0] != DONE:
+                yield job
+            elif entry[1] != job[2] and measured_elsewhere is not None:
+                measured_elsewhere(job, entry[1])
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
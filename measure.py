@@ -0,0 +1,349 @@
+import math
+import os
+import signal
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, List, Tuple
+
+from placement import pinned
+
+PERF_START_STRING = "Performance counter stats for "
+
+PROC = "/proc"
+SAMPLE_INTERVAL = 0.1  # Seconds between samples of the process tree of a job
+KILL_GRACE = 2  # Seconds between SIGTERM and SIGKILL when terminating a job
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+Measurement = Tuple[subprocess.CompletedProcess, Dict[str, float] | None]
+
+
+def parse_perf_stats(stats: List[str]):
+    result = {}
+
+    for line in stats[1:]:
+        parts = line.split("#")[0].strip()  # Split at '#' and take the part before it
+        if not parts:
+            continue
+
+        value, key = parts.rsplit(maxsplit=1)
+        # Can't remember this edgecase
+        if value.count('.') > 1:
+            parts = value.split('.')  # type: ignore # (Reassigning variable)
+            value = "".join(parts[0:-1]) + "." + parts[-1]
+
+        result[key] = value.split(maxsplit=1)[0].replace(",", "")
+
+    return result
+
+
+class Cancelled(subprocess.SubprocessError):
+    """
+    The run was stopped early by the caller, eg. because another solver in a race already answered
+    """
+
+    def __init__(self, cmd: List[str], elapsed: float):
+        self.cmd = cmd
+        self.elapsed = elapsed
+
+    def __str__(self):
+        return f"Command '{self.cmd}' was cancelled after {self.elapsed:.2f} seconds"
+
+
+class MemoryExceeded(subprocess.SubprocessError):
+    """
+    The process tree of the run used more resident memory than allowed and was killed
+    """
+
+    def __init__(self, cmd: List[str], max_rss: int, elapsed: float):
+        self.cmd = cmd
+        self.max_rss = max_rss
+        self.elapsed = elapsed
+
+    def __str__(self):
+        return f"Command '{self.cmd}' was killed after using {self.max_rss} KiB of memory"
+
+
+class ProcessTree:
+    """
+    Tracks all processes of a job, the job is started as leader of its own process group
+    Members are found by walking the children of the leader and of all members seen so far,
+    so processes that were orphaned(reparented to init) stay tracked as long as they are in the group
+    """
+
+    def __init__(self, pgid: int):
+        self.pgid = pgid
+        self.known = {pgid}
+        self.max_rss = 0  # Peak of the summed resident memory of all members, KiB
+        self.cpu_times: Dict[int, float] = {}  # Last seen user + system time of every member, seconds
+
+    def sample(self, full: bool = False) -> Dict[int, Tuple[float, int]]:
+        """
+        Read the cpu time(seconds) and resident memory(KiB) of all living members, and update the peak memory
+        :param full Also look at all processes of the system, to find members started and orphaned since the last sample
+        """
+        members = {}
+        todo = list(self.known)
+        if full:
+            todo.extend(int(entry.name) for entry in os.scandir(PROC) if entry.name.isdigit())
+        while todo:
+            pid = todo.pop()
+            if pid in members:
+                continue
+
+            stat = read_stat(pid)
+            if stat is None or stat[0] != self.pgid:
+                continue
+
+            members[pid] = stat[1:]
+            todo.extend(read_children(pid))
+
+        self.known = set(members) | {self.pgid}
+        self.max_rss = max(self.max_rss, sum(rss for _, rss in members.values()))
+        self.cpu_times.update((pid, cpu) for pid, (cpu, _) in members.items())
+
+        return members
+
+    def alive(self) -> bool:
+        """
+        If any member of the group is still running, zombies waiting to be reaped by init do not count
+        """
+        try:
+            os.killpg(self.pgid, 0)
+        except ProcessLookupError:
+            return False
+
+        return bool(self.sample(full=True)) if os.path.isdir(PROC) else True
+
+    def signal(self, sig: int):
+        try:
+            os.killpg(self.pgid, sig)
+        except ProcessLookupError:
+            pass
+
+    def terminate(self, grace: float = KILL_GRACE):
+        """
+        Send SIGTERM to the whole group, and SIGKILL to whatever is still running after grace seconds
+        """
+        self.signal(signal.SIGTERM)
+
+        deadline = time.monotonic() + grace
+        while time.monotonic() < deadline:
+            time.sleep(SAMPLE_INTERVAL / 2)
+            if not self.alive():
+                return
+
+        self.signal(signal.SIGKILL)
+
+
+def read_stat(pid: int) -> Tuple[int, float, int] | None:
+    """
+    :returns The process group, cpu time(seconds) and resident memory(KiB) of a running process, None if it is gone or a zombie
+    """
+    try:
+        with open(f"{PROC}/{pid}/stat", "rb") as f:
+            stat = f.read()
+    except OSError:
+        return None
+
+    # The command name may contain spaces and parentheses, the other fields follow the last ')'
+    fields = stat[stat.rindex(b")") + 2:].split()
+    if fields[0] == b"Z":
+        return None
+
+    return int(fields[2]), (int(fields[11]) + int(fields[12])) / CLOCK_TICKS, int(fields[21]) * PAGE_SIZE // 1024
+
+
+def read_children(pid: int) -> List[int]:
+    children = []
+    try:
+        for task in os.scandir(f"{PROC}/{pid}/task"):
+            with open(os.path.join(task.path, "children"), "rb") as f:
+                children.extend(int(child) for child in f.read().split())
+    except OSError:
+        pass  # The process is gone
+
+    return children
+
+
+def exited(pid: int) -> bool:
+    """
+    :returns If the child process already exited, without reaping it
+    """
+    try:
+        return os.waitid(os.P_PID, pid, os.WEXITED | os.WNOHANG | os.WNOWAIT) is not None
+    except ChildProcessError:
+        return True  # Already reaped
+
+
+def run_process(command: List[str], timeout: float, cancel: threading.Event | None = None, memory_limit: int | None = None):
+    """
+    Run the command in its own process group, kill the whole group after timeout seconds or as soon as cancel is set
+    Processes the command leaves behind are killed as well once it exits
+    :param memory_limit Kill the group once its processes together use more resident memory(KiB) than this,
+    checked every SAMPLE_INTERVAL seconds, so a fast allocating solver can briefly overshoot it
+    :returns The finished process, its resource usage from wait4, the wall time in seconds and the usage of the whole process tree
+    :raises subprocess.TimeoutExpired If the command had to be killed after timeout seconds
+    :raises Cancelled If the command was killed because cancel was set
+    :raises MemoryExceeded If the command was killed because of the memory limit
+    The cancel event belongs to this run only, it is also set once the run finished to wake up the watchdog
+    """
+    stop = cancel if cancel is not None else threading.Event()
+    finished = threading.Event()
+    killed_by: List[str] = []
+
+    with tempfile.TemporaryFile() as stdout, tempfile.TemporaryFile() as stderr:
+        start = time.monotonic()
+        with pinned():  # Only the solver runs on the cores assigned to the job, not the watchdog
+            process = subprocess.Popen(command, stdout=stdout, stderr=stderr, start_new_session=True)
+        tree = ProcessTree(process.pid)
+
+        def watchdog():
+            deadline = start + timeout
+            while not stop.wait(max(0, min(SAMPLE_INTERVAL, deadline - time.monotonic()))):
+                if time.monotonic() >= deadline:
+                    killed_by.append("timeout")
+                    tree.terminate()
+                    return
+                tree.sample()
+
+                if memory_limit and tree.max_rss > memory_limit:
+                    killed_by.append("memory")
+                    tree.terminate()
+                    return
+
+            # A run that ended on its own just as cancel was set is complete, its leftovers are killed below
+            if not finished.is_set() and not exited(process.pid):
+                killed_by.append("cancel")
+                tree.terminate()
+
+        threading.Thread(target=watchdog, daemon=True).start()
+
+        try:
+            _, status, usage = os.wait4(process.pid, 0)
+        finally:
+            finished.set()
+            stop.set()
+
+        # Taken before killing the leftovers, their grace period is not part of the run
+        wall_time = time.monotonic() - start
+
+        # Whatever is still in the group was left behind by the command
+        leaked: Dict[int, Tuple[float, int]] = {}
+        if tree.alive():
+            leaked = tree.sample(full=True)
+            tree.terminate()
+
+        process.returncode = os.waitstatus_to_exitcode(status)  # We reaped the process, let Popen know
+
+        if killed_by == ["timeout"]:
+            raise subprocess.TimeoutExpired(command, timeout)
+        if killed_by == ["cancel"]:
+            raise Cancelled(command, wall_time)
+        if killed_by == ["memory"]:
+            raise MemoryExceeded(command, tree.max_rss, wall_time)
+
+        stdout.seek(0)
+        stderr.seek(0)
+        out = subprocess.CompletedProcess(command, process.returncode, stdout.read(), stderr.read())
+
+    # wait4 covers the leader and all descendants that were waited for, add the leftovers that were killed
+    tree_stats = {
+        "tree_cpu_time": usage.ru_utime + usage.ru_stime + sum(tree.cpu_times[pid] for pid in leaked),
+        "tree_max_rss": max(tree.max_rss, usage.ru_maxrss),
+        "leaked_processes": len(leaked),
+    }
+
+    return out, usage, wall_time, tree_stats
+
+
+def measure_perf(command: List[str], timeout: float, cancel: threading.Event | None = None, memory_limit: int | None = None) -> Measurement:
+    """
+    Run the command wrapped in `perf stat`, the counters are parsed from the end of stderr
+    Use this backend if hardware counters (cycles, instructions, ...) are needed
+    """
+    out, _, _, tree_stats = run_process(["perf", "stat", *command], timeout, cancel, memory_limit)
+
+    lines = [" ".join(line.split()) for line in out.stderr.decode("utf-8").splitlines() if line.strip()]
+    perf_index = next((i for i, s in enumerate(lines) if PERF_START_STRING in s), None)
+    if perf_index is None:
+        return out, None
+
+    stats = {}
+    for key, value in parse_perf_stats(lines[perf_index:]).items():
+        try:
+            stats[key] = float(value)
+        except ValueError:
+            pass  # Counters perf could not measure, eg. <not supported>
+
+    stats.update(tree_stats)
+    return out, stats
+
+
+def measure_rusage(command: List[str], timeout: float, cancel: threading.Event | None = None, memory_limit: int | None = None) -> Measurement:
+    """
+    Run the command and collect its resource usage directly from the kernel via wait4
+    :returns The finished process and the structured stats, times are in seconds, max_rss in KiB
+    :raises subprocess.TimeoutExpired If the command had to be killed after timeout seconds
+    :raises Cancelled If the command was killed because cancel was set
+    :raises MemoryExceeded If the processes of the command used more than memory_limit KiB
+    """
+    out, usage, wall_time, tree_stats = run_process(command, timeout, cancel, memory_limit)
+
+    stats = {
+        "user_time": usage.ru_utime,
+        "sys_time": usage.ru_stime,
+        "wall_time": wall_time,
+        "max_rss": usage.ru_maxrss,
+        "voluntary_context_switches": usage.ru_nvcsw,
+        "involuntary_context_switches": usage.ru_nivcsw,
+        **tree_stats,
+    }
+
+    return out, stats
+
+
+# Two sided 95% quantiles of the t distribution for 1..30 degrees of freedom, the normal quantile above
+T_QUANTILES = [12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+               2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+               2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042]
+NORMAL_QUANTILE = 1.960
+
+
+def task_clock(stats: Dict[str, float] | None) -> float | None:
+    """
+    The user time of a run in msec, 'task-clock:u' of perf or the user time of rusage
+    """
+    if not stats:
+        return None
+    if "task-clock:u" in stats:
+        return stats["task-clock:u"]
+    if "user_time" in stats:
+        return stats["user_time"] * 1000
+    return None
+
+
+def sample_statistics(samples: List[float]) -> Dict[str, float]:
+    """
+    Mean, median, standard deviation and the half width of the 95% confidence interval of the mean
+    """
+    n = len(samples)
+    mean = statistics.fmean(samples)
+    std = statistics.stdev(samples) if n > 1 else 0.0
+    quantile = T_QUANTILES[n - 2] if 2 <= n <= len(T_QUANTILES) + 1 else NORMAL_QUANTILE
+
+    return {
+        "task_clock_mean": mean,
+        "task_clock_median": statistics.median(samples),
+        "task_clock_std": std,
+        "task_clock_ci": quantile * std / math.sqrt(n) if n > 1 else 0.0,
+    }
+
+
+MEASURE_BACKENDS: Dict[str, Callable[..., Measurement]] = {
+    "rusage": measure_rusage,
+    "perf": measure_perf,
+}
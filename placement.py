@@ -0,0 +1,102 @@
+import os
+import threading
+from contextlib import contextmanager
+from typing import List, Set
+
+SYS_CPU = "/sys/devices/system/cpu"
+
+assigned = threading.local()  # The cores assigned to the jobs of every thread
+
+
+def parse_cpu_list(text: str) -> Set[int]:
+    """
+    Parse a kernel cpu list, eg. "0-3,8,10-11"
+    """
+    cpus = set()
+    for part in text.strip().split(","):
+        if not part:
+            continue
+        first, _, last = part.partition("-")
+        cpus.update(range(int(first), int(last or first) + 1))
+
+    return cpus
+
+
+def physical_cores(cpus: Set[int]) -> List[int]:
+    """
+    One cpu per physical core, the hyperthread(SMT) siblings of a core are left out
+    Cpus without topology information are treated as separate cores
+    """
+    cores = []
+    seen: Set[int] = set()
+    for cpu in sorted(cpus):
+        if cpu in seen:
+            continue
+
+        try:
+            with open(os.path.join(SYS_CPU, f"cpu{cpu}", "topology", "thread_siblings_list"), "r") as f:
+                siblings = parse_cpu_list(f.read())
+        except OSError:
+            siblings = {cpu}
+
+        seen.update(siblings | {cpu})
+        cores.append(cpu)
+
+    return cores
+
+
+def core_sets(n_jobs: int, cores_per_job: int = 1, avoid_smt: bool = False) -> List[Set[int]]:
+    """
+    Split the cpus this process may run on into dedicated, disjoint core sets, one per parallel job
+    :param avoid_smt Only use one hyperthread of every physical core, so no two jobs share a core
+    :returns At most n_jobs core sets, fewer if there are not enough cpus
+    """
+    cpus = sorted(os.sched_getaffinity(0))
+    if avoid_smt:
+        cpus = physical_cores(set(cpus))
+
+    n_sets = min(n_jobs, len(cpus) // cores_per_job)
+    return [set(cpus[i * cores_per_job:(i + 1) * cores_per_job]) for i in range(n_sets)]
+
+
+def pin(cores: Set[int] | None):
+    """
+    Assign dedicated cores to the jobs the calling thread starts from now on(see pinned)
+    Only the solver processes are pinned, the thread itself and the watchdog sampling the solver stay off these cores
+    """
+    assigned.cores = set(cores) if cores else None
+
+
+def assigned_cores() -> Set[int] | None:
+    return getattr(assigned, "cores", None)
+
+
+@contextmanager
+def pinned():
+    """
+    Pin the calling thread to its assigned cores while it starts a process, the process inherits the pinning
+    and the thread returns to its previous cores afterwards
+    """
+    cores = assigned_cores()
+    if not cores:
+        yield
+        return
+
+    previous = os.sched_getaffinity(0)
+    os.sched_setaffinity(0, cores)
+    try:
+        yield
+    finally:
+        os.sched_setaffinity(0, previous)
+
+
+def avoid(placements: List[Set[int]]) -> Set[int]:
+    """
+    Move the calling thread, and all threads it starts from now on, off the cores dedicated to jobs
+    The runner itself(workers, watchdogs, progress) then only runs on the remaining cores, if there are any left
+    :returns The remaining cores, empty if the jobs use all cores and the runner shares them
+    """
+    spare = os.sched_getaffinity(0) - set().union(*placements)
+    if spare:
+        os.sched_setaffinity(0, spare)
+    return spare
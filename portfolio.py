@@ -0,0 +1,253 @@
+import itertools
+import math
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+BUDGET = 60000  # Default time budget in msec, the timeout the solvers are configured with
+SLICES = 20  # Number of time slices the budget is divided into for schedules
+MAX_SCHEDULE_SOLVERS = 8  # The order of a schedule is searched over all 2^8 sets of solvers
+MAX_ALLOCATIONS = 1_000_000  # Allocations of the slices to the solvers, 8 solvers and 20 slices give 888030
+
+
+def runtime_matrix(df) -> Tuple[pd.Index, List[str], np.ndarray]:
+    """
+    Build the problem x solver matrix of 'task-clock:u', unsolved runs are inf
+    A run counts as solved if it was successful and answered sat or unsat
+    :returns The problems (rows), the solvers (columns) and the matrix
+    """
+    solved = df[(df['status'] == 'Success') & df['sanity_sat'].isin(['sat', 'unsat'])]
+    problems = pd.Index(df['problem'].unique())
+    solvers = sorted(df['solver'].unique())
+
+    pivot = solved.pivot_table(index='problem', columns='solver', values='task-clock:u', aggfunc='min', observed=True)
+    pivot = pivot.reindex(index=problems, columns=solvers)
+
+    return problems, solvers, pivot.to_numpy(dtype=np.float64, na_value=np.inf)
+
+
+def virtual_best(matrix: np.ndarray) -> np.ndarray:
+    """
+    The runtime of the virtual best solver on every problem, inf if no solver solved it
+    """
+    return matrix.min(axis=1) if matrix.shape[1] else np.full(matrix.shape[0], np.inf)
+
+
+def cactus_data(times: np.ndarray) -> np.ndarray:
+    """
+    The sorted runtimes of all solved problems, the cactus curve of a (virtual) solver
+    """
+    return np.sort(times[np.isfinite(times)])
+
+
+def bitsets(solved: np.ndarray) -> List[int]:
+    """
+    Pack the columns of a boolean problem x solver matrix into python integers, one bit per problem
+    Unions and counts of solved problems are then a single | and bit_count
+    """
+    packed = np.packbits(solved, axis=0, bitorder="little")
+    return [int.from_bytes(packed[:, i].tobytes(), "little") for i in range(solved.shape[1])]
+
+
+def best_portfolios(matrix: np.ndarray, budget: float = BUDGET) -> Dict[int, Tuple[Tuple[int, ...], int, float]]:
+    """
+    Find the best portfolio of every size k, solvers running in parallel on the same problem
+    The best portfolio solves the most problems within the budget, ties are broken by the smaller total time
+    Subsets that can not reach the best count even with all remaining solvers are pruned
+    :returns For every k, the solver indices of the best portfolio, the number of solved problems and the total time
+    """
+    solved = matrix <= budget
+    sets = bitsets(solved)
+    n = len(sets)
+
+    # Union of all solvers from i on, the best any extension of a subset can reach
+    suffix = [0] * (n + 1)
+    for i in range(n - 1, -1, -1):
+        suffix[i] = suffix[i + 1] | sets[i]
+
+    def total_time(subset: Tuple[int, ...]) -> float:
+        times = matrix[:, list(subset)].min(axis=1)
+        return float(times[times <= budget].sum())
+
+    result = {}
+    for k in range(1, n + 1):
+        best: Tuple[Tuple[int, ...], int, float] = ((), -1, np.inf)
+
+        def search(start: int, chosen: Tuple[int, ...], covered: int):
+            nonlocal best
+            if len(chosen) == k:
+                count = covered.bit_count()
+                if count > best[1] or (count == best[1] and total_time(chosen) < best[2]):
+                    best = (chosen, count, total_time(chosen))
+                return
+
+            for i in range(start, n - (k - len(chosen)) + 1):
+                if (covered | suffix[i]).bit_count() < best[1]:
+                    break  # Later starts only have fewer solvers left
+                search(i + 1, chosen + (i,), covered | sets[i])
+
+        search(0, (), 0)
+        result[k] = best
+
+    return result
+
+
+def check_schedule_size(solvers: int, slices: int):
+    """
+    :raises ValueError If the exhaustive schedule search would be too large, every allocation of the slices
+                       and every order of the solvers is evaluated
+    """
+    if solvers > MAX_SCHEDULE_SOLVERS:
+        raise ValueError(f"Schedules are limited to {MAX_SCHEDULE_SOLVERS} solvers, got {solvers}, select fewer solvers")
+    if math.comb(slices + solvers - 1, solvers - 1) > MAX_ALLOCATIONS:
+        raise ValueError(f"Splitting {slices} slices between {solvers} solvers gives more than {MAX_ALLOCATIONS} allocations, use fewer slices")
+
+
+def static_schedule(matrix: np.ndarray, budget: float = BUDGET, slices: int = SLICES) -> Tuple[np.ndarray, int]:
+    """
+    Find the optimal static schedule, running the solvers one after another on a single core
+    The budget is divided into slices, every solver gets a number of slices, all allocations are evaluated
+    Allocations solving the same number of problems are ranked by the total time of their best order(see sequential_schedule)
+    :returns The time each solver gets and the number of problems solved by the schedule
+    :raises ValueError If there are more than MAX_SCHEDULE_SOLVERS solvers or MAX_ALLOCATIONS allocations
+    """
+    n = matrix.shape[1]
+    check_schedule_size(n, slices)
+    step = budget / slices
+
+    # solved_within[s][g] the problems solver s solves within g slices
+    solved_within = [bitsets(matrix <= g * step) for g in range(slices + 1)]
+
+    tied: List[Tuple[int, ...]] = []
+    best_count = -1
+    for allocation in compositions(slices, n):
+        covered = 0
+        for solver, g in enumerate(allocation):
+            covered |= solved_within[g][solver]
+        count = covered.bit_count()
+        if count > best_count:
+            tied, best_count = [allocation], count
+        elif count == best_count:
+            tied.append(allocation)
+
+    # A problem takes at least the time of the fastest solver solving it within its slice, in any order,
+    # the exact total is only computed for allocations whose lower bound can still beat the best one
+    bounds = []
+    for allocation in tied:
+        limits = np.array(allocation) * step
+        times = np.where(matrix <= limits, matrix, np.inf).min(axis=1)
+        bounds.append(times[np.isfinite(times)].sum())
+
+    best_allocation, best_total = tied[0], np.inf
+    for i in np.argsort(bounds, kind="stable"):
+        if bounds[i] >= best_total:
+            break
+        _, total = best_order(matrix, np.array(tied[i]) * step)
+        if total < best_total:
+            best_allocation, best_total = tied[i], total
+
+    return np.array(best_allocation) * step, best_count
+
+
+def compositions(total: int, parts: int):
+    """
+    All ways to split `total` into `parts` non negative integers
+    """
+    for bars in itertools.combinations(range(total + parts - 1), parts - 1):
+        yield tuple(b - a - 1 for a, b in zip((-1,) + bars, bars + (total + parts - 1,)))
+
+
+def best_order(matrix: np.ndarray, slices: np.ndarray) -> Tuple[Tuple[int, ...], float]:
+    """
+    The order of the solvers with a slice, so the total time of the solved problems is minimal
+    Every problem costs the full slices of all solvers before the one solving it, so the cost of running a solver next
+    only depends on the set of solvers that already ran, a dynamic program over these sets finds the optimal order
+    :returns The order and the total time of the solved problems
+    """
+    used = [s for s in range(matrix.shape[1]) if slices[s] > 0]
+    solves = [matrix[:, s] <= slices[s] for s in used]
+    full = (1 << len(used)) - 1
+
+    covered = [np.zeros(matrix.shape[0], dtype=bool)]  # Problems solved by the solvers of every set
+    offsets = [0.0]  # Summed slices of every set
+    for subset in range(1, full + 1):
+        low = (subset & -subset).bit_length() - 1
+        covered.append(covered[subset & (subset - 1)] | solves[low])
+        offsets.append(offsets[subset & (subset - 1)] + slices[used[low]])
+
+    best = [np.inf] * (full + 1)
+    last = [-1] * (full + 1)
+    best[0] = 0.0
+    for subset in range(full + 1):
+        if best[subset] == np.inf:
+            continue
+        for j in range(len(used)):
+            if subset >> j & 1:
+                continue
+            new = solves[j] & ~covered[subset]
+            cost = best[subset] + offsets[subset] * new.sum() + matrix[new, used[j]].sum()
+            if cost < best[subset | 1 << j]:
+                best[subset | 1 << j], last[subset | 1 << j] = cost, j
+
+    order = []
+    subset = full
+    while subset:
+        order.append(used[last[subset]])
+        subset &= ~(1 << last[subset])
+
+    return tuple(reversed(order)), float(best[full])
+
+
+def sequential_schedule(matrix: np.ndarray, slices: np.ndarray) -> Tuple[Tuple[int, ...], np.ndarray]:
+    """
+    Order the time slices of a static schedule, so the total time of the solved problems is minimal(see best_order)
+    :returns The order of the solvers (with a slice) and the time of the schedule on every problem, inf if unsolved
+    """
+    order, _ = best_order(matrix, slices)
+
+    times = np.full(matrix.shape[0], np.inf)
+    offset = 0.0
+    for s in order:
+        solves = np.isinf(times) & (matrix[:, s] <= slices[s])
+        times[solves] = offset + matrix[solves, s]
+        offset += slices[s]
+
+    return order, times
+
+
+def portfolio_report(df, budget: float = BUDGET, slices: int = SLICES) -> str:
+    """
+    Summarize the virtual best solver, the best portfolio of every size and the optimal schedules
+    """
+    problems, solvers, matrix = runtime_matrix(df)
+    solved = matrix <= budget
+    lines = [f"Problems: {len(problems)}, budget: {budget:.0f} msec"]
+
+    vbs = virtual_best(matrix)
+    vbs_solved = vbs <= budget
+    lines.append(f"Virtual best solver: {vbs_solved.sum()} solved, {vbs[vbs_solved].sum():.2f} msec total")
+
+    lines.append("Best portfolios (parallel):")
+    for k, (subset, count, total) in best_portfolios(matrix, budget).items():
+        lines.append(f"  k={k}: {count} solved, {total:.2f} msec total, {', '.join(solvers[i] for i in subset)}")
+
+    try:
+        allocation, count = static_schedule(matrix, budget, slices)
+    except ValueError as e:
+        lines.append(f"Schedules skipped: {e}")
+    else:
+        lines.append(f"Static schedule (single core): {count} solved")
+        for s in np.flatnonzero(allocation):
+            lines.append(f"  {solvers[s]}: {allocation[s]:.0f} msec")
+
+        order, times = sequential_schedule(matrix, allocation)
+        finite = np.isfinite(times)
+        lines.append(f"Sequential schedule: {finite.sum()} solved, {times[finite].sum():.2f} msec total, "
+                     f"order {' -> '.join(solvers[s] for s in order)}")
+
+    lines.append("Single solvers:")
+    for s, solver in enumerate(solvers):
+        lines.append(f"  {solver}: {solved[:, s].sum()} solved")
+
+    return "\n".join(lines)
@@ -0,0 +1,242 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterable, List
+
+from results import Timeout, Error, Memout
+
+STATUS_INTERVAL = 10  # Seconds between rewrites of the status file
+RECENT_WINDOW = 300  # Seconds of finished jobs the current throughput(and ETA) is based on
+
+
+def empty_counts() -> Dict[str, int]:
+    return {"total": 0, "done": 0, "timeouts": 0, "errors": 0, "memouts": 0, "cached": 0}
+
+
+class Progress:
+    """
+    Live metrics of a running campaign: jobs done and remaining per solver, throughput, ETA,
+    timeout/error/memout rates and the utilisation of every worker
+    Results are counted by observing the result store, workers report when they start and finish a job
+    """
+
+    def __init__(self, solvers: Iterable[str]):
+        self.started = time.monotonic()
+        self.lock = threading.Lock()
+        self.solvers: Dict[str, Dict[str, int]] = {solver: empty_counts() for solver in solvers}
+        self.total_known = False
+        self.finished: deque = deque()  # Finish times of the recent jobs
+        self.workers: Dict[str, Dict[str, Any]] = {}
+
+    def expect(self, totals: Dict[str, int]):
+        """
+        Set the number of jobs every solver has to run, once it is known
+        """
+        with self.lock:
+            for solver, total in totals.items():
+                self.solvers.setdefault(solver, empty_counts())["total"] = total
+            self.total_known = True
+
+    def record(self, record: Dict[str, Any]):
+        """
+        Count a result, used as observer of the result store
+        """
+        now = time.monotonic()
+        with self.lock:
+            counts = self.solvers.setdefault(record["solver"], empty_counts())
+            counts["done"] += 1
+            counts["timeouts"] += record.get("status") == Timeout
+            counts["errors"] += record.get("status") == Error
+            counts["memouts"] += record.get("status") == Memout
+            counts["cached"] += bool(record.get("cached"))
+
+            self.finished.append(now)
+            while self.finished and now - self.finished[0] > RECENT_WINDOW:
+                self.finished.popleft()
+
+    def job_started(self, worker: str, solver: str, problem: str):
+        with self.lock:
+            state = self.workers.setdefault(worker, {"busy": 0.0, "jobs": 0, "current": None})
+            state["current"] = {"solver": solver, "problem": problem, "since": time.monotonic()}
+
+    def job_finished(self, worker: str):
+        with self.lock:
+            state = self.workers.get(worker)
+            if state is None or state["current"] is None:
+                return
+            state["busy"] += time.monotonic() - state["current"]["since"]
+            state["jobs"] += 1
+            state["current"] = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self.lock:
+            elapsed = now - self.started
+            done = sum(counts["done"] for counts in self.solvers.values())
+            total = sum(counts["total"] for counts in self.solvers.values())
+            remaining = max(total - done, 0) if self.total_known else None
+
+            recent = [t for t in self.finished if now - t <= RECENT_WINDOW]
+            window = min(elapsed, RECENT_WINDOW)
+            throughput = len(recent) / window if window > 0 else 0.0
+
+            solvers = {}
+            for solver, counts in self.solvers.items():
+                solvers[solver] = {
+                    **counts,
+                    "remaining": max(counts["total"] - counts["done"], 0) if self.total_known else None,
+                    "timeout_rate": counts["timeouts"] / counts["done"] if counts["done"] else 0.0,
+                    "error_rate": counts["errors"] / counts["done"] if counts["done"] else 0.0,
+                    "memout_rate": counts["memouts"] / counts["done"] if counts["done"] else 0.0,
+                }
+
+            workers = {}
+            for worker, state in self.workers.items():
+                current = state["current"]
+                busy = state["busy"] + (now - current["since"] if current else 0.0)
+                workers[worker] = {
+                    "jobs": state["jobs"],
+                    "utilisation": busy / elapsed if elapsed > 0 else 0.0,
+                    "current": None if current is None else {
+                        "solver": current["solver"], "problem": current["problem"], "running_for": now - current["since"]
+                    },
+                }
+
+        return {
+            "time": time.time(),
+            "elapsed": elapsed,
+            "done": done,
+            "total": total if self.total_known else None,
+            "remaining": remaining,
+            "throughput": throughput,
+            "eta": remaining / throughput if remaining is not None and throughput > 0 else None,
+            "solvers": solvers,
+            "workers": workers,
+        }
+
+
+def format_duration(seconds: float | None) -> str:
+    if seconds is None:
+        return "?"
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m{seconds:02d}s"
+
+
+def summary_line(snapshot: Dict[str, Any]) -> str:
+    total = snapshot["total"] if snapshot["total"] is not None else "?"
+    busy = [worker["utilisation"] for worker in snapshot["workers"].values()]
+    utilisation = f", {100 * sum(busy) / len(busy):.0f}% busy" if busy else ""
+    return (f"[+] {snapshot['done']}/{total} jobs, {snapshot['throughput']:.2f} jobs/s{utilisation}, "
+            f"ETA {format_duration(snapshot['eta'])}")
+
+
+def write_status(path: str, snapshot: Dict[str, Any]):
+    """
+    Atomically rewrite the status file, readers never see a partially written file
+    """
+    temporary = f"{path}.tmp"
+    with open(temporary, "w") as f:
+        json.dump(snapshot, f, indent=2)
+    os.replace(temporary, path)
+
+
+def escape_label(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def prometheus_text(snapshot: Dict[str, Any]) -> str:
+    """
+    The snapshot in the Prometheus text exposition format
+    """
+    lines: List[str] = []
+
+    def metric(name: str, kind: str, help_text: str, samples: Iterable):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            if value is None:
+                continue
+            label_text = ",".join(f'{key}="{escape_label(label)}"' for key, label in labels.items())
+            lines.append(f"{name}{{{label_text}}} {float(value)}" if label_text else f"{name} {float(value)}")
+
+    solvers = snapshot["solvers"].items()
+    workers = snapshot["workers"].items()
+    metric("runner_jobs_done_total", "counter", "Finished jobs", [({"solver": s}, c["done"]) for s, c in solvers])
+    metric("runner_jobs_remaining", "gauge", "Jobs still to run", [({"solver": s}, c["remaining"]) for s, c in solvers])
+    metric("runner_jobs_timeout_total", "counter", "Jobs that timed out", [({"solver": s}, c["timeouts"]) for s, c in solvers])
+    metric("runner_jobs_error_total", "counter", "Jobs that ended with an error", [({"solver": s}, c["errors"]) for s, c in solvers])
+    metric("runner_jobs_memout_total", "counter", "Jobs that ran out of memory", [({"solver": s}, c["memouts"]) for s, c in solvers])
+    metric("runner_jobs_cached_total", "counter", "Jobs reusing a cached result", [({"solver": s}, c["cached"]) for s, c in solvers])
+    metric("runner_throughput_jobs_per_second", "gauge", "Recently finished jobs per second", [({}, snapshot["throughput"])])
+    metric("runner_eta_seconds", "gauge", "Estimated seconds until all jobs are finished", [({}, snapshot["eta"])])
+    metric("runner_elapsed_seconds", "gauge", "Seconds since the campaign started", [({}, snapshot["elapsed"])])
+    metric("runner_worker_utilisation", "gauge", "Fraction of the time a worker was running a job",
+           [({"worker": w}, state["utilisation"]) for w, state in workers])
+    metric("runner_worker_job_seconds", "gauge", "Seconds the current job of a worker has been running",
+           [({"worker": w, "solver": state["current"]["solver"]}, state["current"]["running_for"]) for w, state in workers if state["current"]])
+
+    return "\n".join(lines) + "\n"
+
+
+class Reporter:
+    """
+    Periodically rewrite the status file and print a progress line, optionally serve the metrics over http
+    """
+
+    def __init__(self, progress: Progress, path: str, interval: float = STATUS_INTERVAL, port: int | None = None):
+        self.progress = progress
+        self.path = path
+        self.interval = interval
+        self.stop = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.server = None
+
+        if port is not None:
+            reporter = self
+
+            class Handler(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    if self.path not in ("/", "/metrics"):
+                        self.send_error(404)
+                        return
+
+                    body = prometheus_text(reporter.progress.snapshot()).encode("utf-8")
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/plain; version=0.0.4")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, format, *args):
+                    pass  # Don't mix the access log into the progress output
+
+            self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+            threading.Thread(target=self.server.serve_forever, daemon=True).start()
+            print(f"[+] Serving metrics on http://127.0.0.1:{port}/metrics")
+
+    def _run(self):
+        while not self.stop.wait(self.interval):
+            self.report()
+
+    def report(self):
+        snapshot = self.progress.snapshot()
+        try:
+            write_status(self.path, snapshot)
+        except OSError as e:
+            print(f"Error writing the status file {self.path}: {e}")
+        print(summary_line(snapshot))
+
+    def start(self):
+        self.thread.start()
+
+    def close(self):
+        self.stop.set()
+        self.thread.join()
+        self.report()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
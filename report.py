@@ -0,0 +1,193 @@
+import html
+import numbers
+import os
+import re
+from multiprocessing import Pool
+from typing import Dict, List, Tuple
+
+import matplotlib
+
+import tag_util
+import visualizer
+
+# Plot types of a report, the heatmap and scatter plot are binned, so their cost does not depend on the number of problems
+PLOTS = {
+    "cactus": visualizer.cactus_plot,
+    "solved": visualizer.solved_barchart,
+    "time": visualizer.sum_time_barchart,
+    "heatmap": visualizer.binned_heatmap,
+    "scatter": visualizer.binned_scatter,
+    "portfolio": visualizer.portfolio_plot,
+}
+FORMATS = ["pdf", "png"]
+OVERALL = "all"  # Label of the partition holding all problems
+
+Task = Tuple[str, str, object, str, List[str]]  # (slug, plot, dataframe, directory, formats)
+
+
+def slugify(label: str) -> str:
+    return re.sub(r"[^A-Za-z0-9]+", "-", label).strip("-").lower() or "untagged"
+
+
+def use_agg():
+    matplotlib.use("agg")
+
+
+def render(task: Task) -> Tuple[str, str, List[str], str | None]:
+    """
+    Render one plot of one partition and save it in every format, runs inside the process pool
+    :returns The slug, the plot, the written files and the error if the plot could not be rendered
+    """
+    import matplotlib.pyplot as plt
+
+    slug, plot, df, directory, formats = task
+    try:
+        fig = PLOTS[plot](df)
+        files = []
+        for extension in formats:
+            name = f"{slug}-{plot}.{extension}"
+            fig.savefig(os.path.join(directory, name))
+            files.append(name)
+        plt.close(fig)
+        return slug, plot, files, None
+    except Exception as e:
+        plt.close("all")
+        return slug, plot, [], str(e)
+
+
+def partitions(df, tags=None) -> Dict[str, Tuple[str, object]]:
+    """
+    All problems and, given tags, every tagset on its own
+    :returns For every partition its slug, mapped to its label and its dataframe
+    """
+    result = {slugify(OVERALL): (OVERALL, df)}
+    if tags is None:
+        return result
+
+    for tagset, frame in sorted(tag_util.split_by_tagset(df, tags).items(), key=lambda item: tag_util.tagset_label(item[0])):
+        if frame.empty:
+            continue
+
+        label = tag_util.tagset_label(tagset)
+        slug = slugify(f"tagset-{label}")
+        while slug in result:
+            slug += "-"
+        result[slug] = (label, frame)
+
+    return result
+
+
+def latex_escape(value) -> str:
+    replacements = {"\\": r"\textbackslash{}", "&": r"\&", "%": r"\%", "$": r"\$", "#": r"\#", "_": r"\_",
+                    "{": r"\{", "}": r"\}", "~": r"\textasciitilde{}", "^": r"\textasciicircum{}"}
+    return "".join(replacements.get(c, c) for c in str(value))
+
+
+def format_value(value):
+    """
+    Floats(including numpy floats) with two decimals, everything else as is
+    """
+    if isinstance(value, numbers.Real) and not isinstance(value, numbers.Integral):
+        return f"{value:.2f}"
+    return value
+
+
+def latex_table(table, caption: str) -> str:
+    header = " & ".join(latex_escape(column) for column in table.columns)
+    rows = [" & ".join(latex_escape(format_value(value)) for value in row) + r" \\"
+            for row in table.itertuples(index=False)]
+
+    return "\n".join([
+        r"\begin{table}[ht]",
+        r"\centering",
+        rf"\caption{{{latex_escape(caption)}}}",
+        rf"\begin{{tabular}}{{l{'r' * (len(table.columns) - 1)}}}",
+        r"\toprule",
+        header + r" \\",
+        r"\midrule",
+        *rows,
+        r"\bottomrule",
+        r"\end{tabular}",
+        r"\end{table}",
+    ])
+
+
+def summaries(df, parts: Dict[str, Tuple[str, object]], tags=None):
+    """
+    The summary table of every partition, the tagsets are summarized in a single groupby
+    """
+    tables = {slugify(OVERALL): visualizer.summary_table(df)}
+    if tags is None:
+        return tables
+
+    by_tagset = visualizer.summary_table(tag_util.with_tagsets(df, tags), by="tagset")
+    labels = {label: slug for slug, (label, _) in parts.items() if slug != slugify(OVERALL)}
+    for label, table in by_tagset.groupby("tagset", observed=True):
+        if label in labels:
+            tables[labels[label]] = table.drop(columns="tagset").reset_index(drop=True)
+
+    return tables
+
+
+def write_report(df, directory: str, plots: List[str], tags=None, formats: List[str] = FORMATS,
+                 workers: int | None = None) -> List[Tuple[str, str, str]]:
+    """
+    Render every plot for all problems and for every tagset across a process pool,
+    and write a LaTeX(summary.tex) and HTML(index.html) summary with the summary table of every partition
+    Plots that could not be rendered are listed in place of the plot in both summaries
+    :returns The label of the partition, the plot and the error of every plot that could not be rendered
+    """
+    os.makedirs(directory, exist_ok=True)
+    parts = partitions(df, tags)
+    tasks = [(slug, plot, frame, directory, formats) for slug, (_, frame) in parts.items() for plot in plots]
+
+    print(f"[+] Rendering {len(tasks)} plots for {len(parts)} partitions")
+    rendered: Dict[Tuple[str, str], List[str]] = {}
+    errors: Dict[Tuple[str, str], str] = {}
+    with Pool(workers, initializer=use_agg) as pool:
+        for slug, plot, files, error in pool.imap_unordered(render, tasks):
+            if error is not None:
+                print(f"[+] Could not render {plot} for {parts[slug][0]}: {error}")
+                errors[(slug, plot)] = error
+            rendered[(slug, plot)] = files
+
+    tables = summaries(df, parts, tags)
+
+    latex = []
+    page = [f"<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\"><title>Benchmark report</title></head><body>"]
+    for slug, (label, _) in parts.items():
+        table = tables.get(slug)
+
+        latex.append(rf"\section*{{{latex_escape(label)}}}")
+        page.append(f"<h2 id=\"{slug}\">{html.escape(label)}</h2>")
+        if table is not None:
+            latex.append(latex_table(table, f"Summary of {label}"))
+            page.append(table.to_html(index=False, float_format="{:.2f}".format))
+
+        for plot in plots:
+            if (slug, plot) in errors:
+                message = f"Could not render the {plot} plot: {errors[(slug, plot)]}"
+                latex.append(rf"\textit{{{latex_escape(message)}}}")
+                page.append(f"<p><em>{html.escape(message)}</em></p>")
+                continue
+
+            files = rendered.get((slug, plot), [])
+            pdf = next((f for f in files if f.endswith(".pdf")), None)
+            png = next((f for f in files if f.endswith(".png")), None)
+            if pdf:
+                latex.append(rf"\begin{{figure}}[ht]\centering\includegraphics[width=\linewidth]{{{pdf}}}\end{{figure}}")
+            if png:
+                page.append(f"<img src=\"{png}\" alt=\"{plot} of {html.escape(label)}\" style=\"max-width: 100%\">")
+
+    page.append("</body></html>")
+
+    with open(os.path.join(directory, "summary.tex"), "w") as f:
+        f.write("% Requires the booktabs and graphicx packages\n" + "\n\n".join(latex) + "\n")
+    with open(os.path.join(directory, "index.html"), "w") as f:
+        f.write("\n".join(page) + "\n")
+
+    print(f"[+] Wrote the report to {directory}")
+    if errors:
+        print(f"[+] {len(errors)} plots could not be rendered")
+
+    return [(parts[slug][0], plot, error) for (slug, plot), error in errors.items()]
@@ -0,0 +1,77 @@
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Dict, List, Tuple
+
+from ledger import content_hash
+
+
+@lru_cache(maxsize=None)
+def command_hash(command: Tuple[str, ...]) -> str:
+    """
+    Hash the solver binary and every other file the command references, eg. the script of a python wrapped solver
+    """
+    digest = hashlib.sha256()
+
+    for i, argument in enumerate(command):
+        path = (shutil.which(argument) if i == 0 else None) or argument
+        if os.path.isfile(path):
+            digest.update(content_hash(path).encode("utf-8"))
+
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    Content addressed cache of result records, shared between runs and campaigns
+    Records are keyed by a hash of the solver binary, its arguments, the timeout(and memory limit), the benchmark content
+    and the measurement backend, which decides the stats a record has
+    """
+
+    def __init__(self, path: str, timeout: float, memory_limit: int | None = None, measure: str = "rusage"):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.timeout = timeout
+        self.measure = measure
+        self.memory_limit = memory_limit
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, solver TEXT NOT NULL, record TEXT NOT NULL, created REAL NOT NULL)"
+        )
+        self.connection.commit()
+
+    def key(self, command: List[str], input_file: str) -> str:
+        parts = [command_hash(tuple(command)), json.dumps(command), str(self.timeout), content_hash(input_file), self.measure]
+        if self.memory_limit is not None:
+            parts.append(str(self.memory_limit))
+        return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Dict[str, Any] | None:
+        with self.lock:
+            row = self.connection.execute("SELECT record FROM results WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, key: str, solver: str, record: Dict[str, Any]):
+        with self.lock:
+            self.connection.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)", (key, solver, json.dumps(record), time.time()))
+            self.connection.commit()
+
+    def invalidate(self, solver: str) -> int:
+        """
+        Drop all cached results of a solver
+        :returns The number of dropped results
+        """
+        with self.lock:
+            deleted = self.connection.execute("DELETE FROM results WHERE solver = ?", (solver,)).rowcount
+            self.connection.commit()
+        return deleted
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
@@ -0,0 +1,134 @@
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+RESULTS_DIR = "results"  # Directory inside the output directory holding the result shards
+ALIASES_DIR = "aliases"  # Directory inside the results directory, mapping benchmarks to the benchmark they were measured as
+SHARD_SIZE = 100_000  # Maximum number of records per shard
+TAIL_SIZE = 2048  # Number of characters kept from the end of stdout and stderr
+
+TIMEOUT_STRING = "timeout"
+OSTRICH_TIMEOUT_STRING = "unknown"
+CVC5_TIMEOUT_STRING = "cvc5 interrupted by timeout."
+
+# Printed by the solvers(or their runtime) when they run out of memory
+MEMOUT_STRINGS = ["out of memory", "std::bad_alloc", "java.lang.OutOfMemoryError", "MemoryError"]
+
+Success = "Success"
+Timeout = "Timeout"
+Error = "Error"
+Memout = "Memout"
+
+
+def classify(returncode: int, stdout: str, stderr: str = "") -> Tuple[str, str | None]:
+    """
+    Classify a finished solver run the same way the dataparser classifies the legacy .out files
+    Runs that failed because the solver ran out of memory are classified as Memout instead of Error
+    Runs that exit with 0 without printing an answer are classified as Error
+    :returns The status of the run and the answer of the solver (sat, unsat, ...) if it was successful
+    """
+    # The legacy .out files hold stdout followed by stderr, so without stdout their first line is the first line of stderr
+    lines = [" ".join(line.split()) for line in stdout.splitlines() if line.strip()]
+    errors = [" ".join(line.split()) for line in stderr.splitlines() if line.strip()]
+    first = lines[0] if lines else errors[0] if errors else ""
+
+    # The solvers indicate a clean timeout on their first line
+    if TIMEOUT_STRING in first or CVC5_TIMEOUT_STRING in first or OSTRICH_TIMEOUT_STRING in first:
+        return (Timeout, None)
+
+    if returncode != 0 or first.startswith("(error"):
+        if any(marker in stdout or marker in stderr for marker in MEMOUT_STRINGS):
+            return (Memout, None)
+
+    if returncode != 0 or not lines:
+        return (Error, None)
+
+    return (Success, first)
+
+
+def tail(text: str) -> str:
+    return text[-TAIL_SIZE:]
+
+
+class ResultStore:
+    """
+    Append only store of structured result records, written as JSONL shards
+    Every runner invocation writes its own shards, so several runners never write to the same file
+    """
+
+    def __init__(self, directory: str, shard_size: int = SHARD_SIZE):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.shard_size = shard_size
+        self.prefix = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        self.lock = threading.Lock()
+        self.shard = 0
+        self.count = 0
+        self.file = None
+        self.aliases = None
+        self.observers: List[Callable[[Dict[str, Any]], None]] = []  # Called with every appended record, eg. progress.Progress.record
+
+    def _rotate(self):
+        if self.file:
+            self.file.close()
+        self.file = open(os.path.join(self.directory, f"{self.prefix}-{self.shard:04d}.jsonl"), "a")
+        self.shard += 1
+        self.count = 0
+
+    def append(self, record: Dict[str, Any]):
+        line = json.dumps(record) + "\n"
+        with self.lock:
+            if self.file is None or self.count >= self.shard_size:
+                self._rotate()
+
+            # Flush every record, the ledger marks a job as done right after this returns
+            self.file.write(line)  # type: ignore # (Set by _rotate)
+            self.file.flush()  # type: ignore
+            self.count += 1
+
+        for observer in self.observers:
+            observer(record)
+
+    def add_alias(self, problem: str, alias_of: str, solver: str | None = None):
+        """
+        Record that `problem` has the same content as `alias_of`, and shares its results
+        :param solver Only share the result of this solver, all solvers if None
+        """
+        line = json.dumps({"problem": problem, "alias_of": alias_of, "solver": solver}) + "\n"
+        with self.lock:
+            if self.aliases is None:
+                directory = os.path.join(self.directory, ALIASES_DIR)
+                os.makedirs(directory, exist_ok=True)
+                self.aliases = open(os.path.join(directory, f"{self.prefix}.jsonl"), "a")
+
+            self.aliases.write(line)
+            self.aliases.flush()
+
+    def close(self):
+        with self.lock:
+            if self.file:
+                self.file.close()
+                self.file = None
+            if self.aliases:
+                self.aliases.close()
+                self.aliases = None
+
+
+def shard_paths(directory: str) -> List[str]:
+    """
+    All shards of a result store, in the order they were written
+    """
+    if not os.path.isdir(directory):
+        return []
+
+    return sorted(os.path.join(directory, f) for f in os.listdir(directory) if f.endswith(".jsonl"))
+
+
+def iter_records(directory: str) -> Iterator[Dict[str, Any]]:
+    for path in shard_paths(directory):
+        with open(path, "r") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
@@ -1,14 +1,39 @@
+import statistics
 import subprocess
 import os
 import threading
-from typing import List, Iterator, cast, Tuple, Dict
+import queue
+import time
+from typing import Callable, List, Iterator, Iterable, Set, cast, Tuple, Dict
 import argparse
 import json
+from functools import partial
+from itertools import groupby
+from collections import Counter
+
+from multiprocessing import Pool
+
+from features import canonical_hash
+import distributed
+from ledger import Ledger
+from placement import assigned_cores, avoid, core_sets, pin
+from progress import Progress, Reporter
+from result_cache import ResultCache
+from measure import MEASURE_BACKENDS, Measurement, Cancelled, MemoryExceeded, sample_statistics, task_clock
+from results import RESULTS_DIR, ResultStore, classify, tail, Success, Timeout, Error, Memout
 
 OUTPUT_DIR = "out"
 seperator = ","
 TIMEOUT = 70  # Timeout in seconds, Give the solvers 10 seconds to clean up
 
+LEDGER_FILE = "ledger.sqlite"
+CACHE_FILE = "cache.sqlite"
+STATUS_FILE = "status.json"
+TOKEN_VARIABLE = "RUNNER_TOKEN"  # Environment variable holding the token of the coordinator and its workers
+MIN_REPEATS = 3  # Minimum number of runs before an adaptive repetition may stop
+
+Job = Tuple[str, List[str], str]  # (solver name, solver command, input file)
+
 
 class LazyPathIterator:
     def __init__(self, path: str, skip: int = 0):
@@ -25,7 +50,7 @@ class LazyPathIterator:
             # Yield only files ending with .smt2
             for f in files:
                 if f.endswith(".smt2"):
-                    if count <= self.skip:
+                    if count < self.skip:
                         count += 1
                         continue
 
@@ -40,47 +65,438 @@ def read_config() -> dict:
         return config
 
 
-def benchmark_solver(solver_name: str, solver_command: List[str], input_file: str):
+def store_record(store: ResultStore, record: Dict) -> bool:
+    record["time"] = time.time()
+
+    try:
+        store.append(record)
+    except Exception as e:
+        print(f"Error writing result of {record['solver']} on {record['problem']}: {e}")
+        return False
+
+    return True
+
+
+def measure_job(solver_name: str,
+                solver_command: List[str],
+                input_file: str,
+                measure: Callable[..., Measurement] = MEASURE_BACKENDS["rusage"],
+                cache: ResultCache | None = None,
+                cache_only: bool = False,
+                cancel: threading.Event | None = None,
+                repeats: int = 1,
+                target_ci: float | None = None,
+                min_repeats: int = MIN_REPEATS) -> Tuple[Dict | None, bool]:
     """
-    Runs a benchmark on a single file with a single solver
-    param: input_file The full path of the input file
+    Runs a single solver on a single file, without storing the result
+    param: cancel If set while the solver runs, the solver is killed and the record is marked as censored
+    param: repeats Run successful jobs up to this many times(see repeat_measurement), not used together with cancel
+    returns: The result record(None on a cache_only miss) and if the run itself succeeded
     """
 
-    output = os.path.join(OUTPUT_DIR, f"{os.path.splitext(input_file)[0]}_{solver_name}.out")
+    record = {"problem": input_file, "solver": solver_name}
 
-    os.makedirs(os.path.dirname(output), exist_ok=True)
+    cache_key = None
+    if cache is not None:
+        cache_key = cache.key(solver_command, input_file)
+        cached = cache.get(cache_key)
 
-    perf_command = ["perf", "stat", *solver_command, input_file]
+        # A cached single run does not count for a repeated measurement
+        required = min(repeats, min_repeats) if target_ci is not None else repeats
+        if cached is not None and (cached.get("status") != Success or cached.get("repeats", 1) >= required):
+            record.update(cached, cached=True)
+            return record, True
+
+    if cache_only:
+        return None, False
+
+    success = True
+    censored = False
 
     try:
-        with open(output, "w+") as f:
-            try:
-                out = subprocess.run(perf_command, timeout=TIMEOUT, capture_output=True)
-                f.write(f"{out.returncode}\n{out.stdout.decode('utf-8')}\n{out.stderr.decode('utf-8')}\n")
-            except subprocess.TimeoutExpired:
-                f.write("hardtimeout")
+        out, stats = measure([*solver_command, input_file], TIMEOUT, cancel)
+        stdout = out.stdout.decode("utf-8", errors="replace")
+        stderr = out.stderr.decode("utf-8", errors="replace")
+        status, answer = classify(out.returncode, stdout, stderr)
+
+        record.update(status=status, answer=answer, returncode=out.returncode, **(stats or {}))
+        record.update(stdout_tail=tail(stdout), stderr_tail=tail(stderr))
 
-            except Exception as e:
-                f.write(f"3\n{e}\n")  # Error code 3
-                print(f"{solver_name} ran into a problem: {e}")
+        # Timeouts and errors are not repeated
+        if status == Success and repeats > 1 and cancel is None:
+            record.update(repeat_measurement([*solver_command, input_file], measure, out.returncode, stats, repeats, target_ci, min_repeats))
+
+    except subprocess.TimeoutExpired:
+        record.update(status=Timeout, answer=None, returncode=None)
+
+    except MemoryExceeded as e:
+        record.update(status=Memout, answer=None, returncode=None, wall_time=e.elapsed, tree_max_rss=e.max_rss)
+
+    except Cancelled as e:
+        # Stopped early, the solver would have needed at least wall_time, the analysis treats it like a timeout
+        record.update(status=Timeout, answer=None, returncode=None, wall_time=e.elapsed, censored=True)
+        censored = True
 
     except Exception as e:
-        print(f"Error writing to output file {output}: {e}")
+        record.update(status=Error, answer=None, returncode=3, stderr_tail=str(e))  # Error code 3
+        print(f"{solver_name} ran into a problem: {e}")
+        success = False
+
+    # Only measurements are cached, not failures of the runner itself or runs that were cut short
+    if success and not censored and cache is not None and cache_key is not None:
+        cache.put(cache_key, solver_name, {k: v for k, v in record.items() if k not in ("problem", "solver")})
 
+    return record, success
 
-def worker(solver: Tuple[str, List[str]], pool: LazyPathIterator):
+
+def repeat_measurement(command: List[str],
+                       measure: Callable[..., Measurement],
+                       returncode: int,
+                       stats: Dict[str, float] | None,
+                       repeats: int,
+                       target_ci: float | None = None,
+                       min_repeats: int = MIN_REPEATS) -> Dict:
+    """
+    Measure a successful run again, up to `repeats` runs in total
+    With a target_ci the repetitions stop early, once at least min_repeats runs were made
+    and the 95% confidence interval of the mean task clock is within target_ci * mean on either side
+    A repetition that times out, fails or answers with another exit code ends the repetitions
+    returns: The stats of the median run, the median as 'task-clock:u', the number of repeats, all samples and their statistics
+    """
+    first = task_clock(stats)
+    if first is None:
+        return {}
+
+    runs = [(first, stats)]
+    while len(runs) < repeats:
+        if target_ci is not None and len(runs) >= max(min_repeats, 2):
+            summary = sample_statistics([sample for sample, _ in runs])
+            if summary["task_clock_ci"] <= target_ci * summary["task_clock_mean"]:
+                break
+
+        try:
+            out, repeated = measure(command, TIMEOUT)
+        except subprocess.SubprocessError:
+            break
+
+        sample = task_clock(repeated)
+        if out.returncode != returncode or sample is None:
+            break
+        runs.append((sample, repeated))
+
+    samples = [sample for sample, _ in runs]
+    _, median_stats = sorted(runs, key=lambda run: run[0])[(len(runs) - 1) // 2]
+
+    return {
+        **(median_stats or {}),
+        "task-clock:u": statistics.median(samples),
+        "repeats": len(samples),
+        "task_clock_samples": samples,
+        **sample_statistics(samples),
+    }
+
+
+def benchmark_solver(solver_name: str,
+                     solver_command: List[str],
+                     input_file: str,
+                     store: ResultStore,
+                     measure: Callable[..., Measurement] = MEASURE_BACKENDS["rusage"],
+                     cache: ResultCache | None = None,
+                     cache_only: bool = False,
+                     repeats: int = 1,
+                     target_ci: float | None = None,
+                     min_repeats: int = MIN_REPEATS) -> bool:
+    """
+    Runs a benchmark on a single file with a single solver and appends the result to the store
+    param: input_file The full path of the input file
+    param: store The result store to append the result record to
+    param: measure The backend used to run the solver and collect its resource usage
+    param: cache If given, a cached result is reused instead of running the solver, new results are cached
+    param: cache_only Never run the solver, only reuse cached results
+    param: repeats The maximum number of runs of a successful job, target_ci stops earlier(see repeat_measurement)
+    returns: If a result(including a timeout) was recorded for the run
+    """
+    record, success = measure_job(solver_name, solver_command, input_file, measure, cache, cache_only,
+                                  repeats=repeats, target_ci=target_ci, min_repeats=min_repeats)
+    if record is None:
+        return False
+
+    return store_record(store, record) and success
+
+
+def race_solvers(jobs: List[Job],
+                 store: ResultStore,
+                 measure: Callable[..., Measurement] = MEASURE_BACKENDS["rusage"],
+                 cache: ResultCache | None = None,
+                 cache_only: bool = False,
+                 quorum: int = 1,
+                 factor: float | None = None,
+                 pinned: bool = False) -> List[bool]:
+    """
+    Run all solvers on the same file at once, and stop the losers early
+    The remaining solvers are cancelled once `quorum` solvers agree on an answer(sat/unsat),
+    a solver is cancelled once it ran `factor` times longer than the fastest answer so far
+    Cancelled runs are recorded as censored timeouts
+    param: jobs The jobs of all solvers on one file
+    param: pinned Split the cores the race is pinned to between the solvers
+    returns: For every job, if a complete result was recorded, censored runs are not complete so the ledger keeps them pending
+    """
+    results: "queue.Queue[Tuple[int, Dict | None, bool]]" = queue.Queue()
+    cancels = [threading.Event() for _ in jobs]
+
+    cores = sorted(assigned_cores() or ())
+    per_solver = len(cores) // len(jobs)
+
+    def run_one(i: int):
+        if pinned:
+            # Too few cores to split, the solvers share the cores of the race
+            pin(set(cores[i * per_solver:(i + 1) * per_solver]) if per_solver else set(cores))
+
+        try:
+            record, success = measure_job(*jobs[i], measure=measure, cache=cache, cache_only=cache_only, cancel=cancels[i])
+        except Exception as e:
+            print(f"Some Exception occured: {e}")
+            record, success = None, False
+        results.put((i, record, success))
+
+    start = time.monotonic()
+    for i in range(len(jobs)):
+        threading.Thread(target=run_one, args=(i,), daemon=True).start()
+
+    answers: Dict[str, int] = {}
+    best = None
+    recorded: Dict[int, bool] = {}
+    while len(recorded) < len(jobs):
+        try:
+            i, record, success = results.get(timeout=0.05 if best is not None and factor else None)
+        except queue.Empty:
+            i = None
+
+        if i is not None:
+            recorded[i] = record is not None and store_record(store, record) and success and not record.get("censored")
+
+            if record is not None and record["status"] == Success and record["answer"] in ("sat", "unsat"):
+                answers[record["answer"]] = answers.get(record["answer"], 0) + 1
+                elapsed = record.get("wall_time", time.monotonic() - start)
+                best = elapsed if best is None else min(best, elapsed)
+
+                if answers[record["answer"]] >= quorum:
+                    for cancel in cancels:
+                        cancel.set()
+
+        if best is not None and factor and time.monotonic() - start > factor * best:
+            for cancel in cancels:
+                cancel.set()
+
+    return [recorded[i] for i in range(len(jobs))]
+
+
+def readable_hash(path: str) -> str | None:
+    """
+    :returns The canonical hash of the benchmark, None if it can not be read(eg. a broken symlink)
+    """
+    try:
+        return canonical_hash(path)
+    except OSError:
+        return None
+
+
+def deduplicate(files: Iterable[str], workers: int) -> Tuple[List[str], Dict[str, str], Dict[str, str]]:
+    """
+    Find benchmarks with the same content, ignoring whitespace and comments
+    The files are hashed across a pool of processes, unreadable files are kept as they are, so their jobs fail like without deduplication
+    :returns The unique benchmarks, a mapping from every duplicate to the unique benchmark it equals, the hash of every readable file
+    """
+    files = list(files)
+    unique: Dict[str, str] = {}  # hash -> first file with that hash
+    aliases: Dict[str, str] = {}
+    unreadable: List[str] = []
+
+    with Pool(workers) as pool:
+        hashes = {f: h for f, h in zip(files, pool.imap(readable_hash, files, chunksize=32)) if h is not None}
+
+    for f in files:
+        if f not in hashes:
+            unreadable.append(f)
+            continue
+        representative = unique.setdefault(hashes[f], f)
+        if representative != f:
+            aliases[f] = representative
+
+    return list(unique.values()) + unreadable, aliases, hashes
+
+
+def generate_jobs(solvers: Iterable[Tuple[str, List[str]]], pool: Iterable[str]) -> Iterator[Job]:
+    """
+    Lazily pair every benchmark file with every solver
+    Solvers are interleaved per file, so all solvers make progress at the same rate
+    """
+    solvers = list(solvers)
     for f in pool:
+        for name, command in solvers:
+            yield (name, command, f)
+
+
+def longest_first(jobs: Iterable[Job]) -> List[Job]:
+    """
+    Order jobs by their expected runtime, longest first, so stragglers start early
+    The size of the benchmark file is used as estimate for the expected runtime, unreadable benchmarks fail at once and go last
+    """
+    def size(job: Job) -> int:
         try:
-            benchmark_solver(solver[0], solver[1], f)
+            return os.path.getsize(job[2])
+        except OSError:
+            return -1
+
+    return sorted(jobs, key=size, reverse=True)
+
+
+def worker(jobs: "queue.Queue[Job | None]",
+           ledger: Ledger,
+           run_job: Callable[..., bool],
+           cores: Set[int] | None = None,
+           progress: Progress | None = None):
+    pin(cores)
+    name = threading.current_thread().name
+    while (job := jobs.get()) is not None:
+        if progress is not None:
+            progress.job_started(name, job[0], job[2])
+
+        key = None
+        success = False
+        try:
+            # Hashing fails for unreadable benchmarks(eg. a broken symlink), the job is skipped but the worker keeps running
+            key = ledger.key(*job)
+            ledger.start(key, job[2])
+            success = run_job(*job)
+        except Exception as e:
+            print(f"Some Exception occured: {e}")
+
+        if key is not None:
+            ledger.finish(key, job[2], success)
+        if progress is not None:
+            progress.job_finished(name)
+
+
+def race_worker(races: "queue.Queue[List[Job] | None]",
+                ledger: Ledger,
+                run_race: Callable[[List[Job]], List[bool]],
+                cores: Set[int] | None = None,
+                progress: Progress | None = None):
+    pin(cores)
+    name = threading.current_thread().name
+    while (jobs := races.get()) is not None:
+        if progress is not None:
+            progress.job_started(name, "race", jobs[0][2])
+
+        keys = []
+        recorded = [False] * len(jobs)
+        try:
+            keys = [ledger.key(*job) for job in jobs]
+            for job, key in zip(jobs, keys):
+                ledger.start(key, job[2])
+            recorded = run_race(jobs)
         except Exception as e:
             print(f"Some Exception occured: {e}")
 
+        for job, key, success in zip(jobs, keys, recorded):
+            ledger.finish(key, job[2], success)
+        if progress is not None:
+            progress.job_finished(name)
+
+
+def group_by_file(jobs: Iterable[Job]) -> Iterator[List[Job]]:
+    """
+    Group consecutive jobs on the same file, one race per benchmark
+    """
+    for _, group in groupby(jobs, key=lambda job: job[2]):
+        yield list(group)
+
+
+def schedule(jobs: Iterable,
+             n_jobs: int,
+             ledger: Ledger,
+             run_job: Callable,
+             target: Callable = worker,
+             placements: List[Set[int]] | None = None,
+             progress: Progress | None = None) -> None:
+    """
+    Feed all jobs through a shared queue into a pool of n_jobs workers
+    The queue is bounded, so lazily generated jobs are only produced when a worker is free
+    param: target The worker function, `race_worker` to run races instead of single jobs
+    param: placements The dedicated cores of every worker, the pool has one worker per core set
+    param: progress Tracks what every worker is running
+    """
+    if placements:
+        n_jobs = len(placements)
+
+    job_queue: queue.Queue = queue.Queue(maxsize=2 * n_jobs)
+
+    threads = [threading.Thread(target=target,
+                                name=f"worker-{i}",
+                                args=(job_queue, ledger, run_job, placements[i] if placements else None, progress))
+               for i in range(n_jobs)]
+    for thread in threads:
+        thread.start()
+
+    for job in jobs:
+        job_queue.put(job)
+
+    # One stop signal per worker
+    for _ in threads:
+        job_queue.put(None)
+
+    for thread in threads:
+        thread.join()
+
+
+def count_jobs(progress: Progress, jobs: Iterable[Job], files: Iterable[str], solvers: List[str]):
+    """
+    Tell the progress how many jobs every solver has to run
+    Lazily walked benchmark directories are counted in the background, when resuming this is an upper bound
+    """
+    if isinstance(jobs, list):
+        progress.expect(Counter(job[0] for job in jobs))
+    elif isinstance(files, list):
+        progress.expect({solver: len(files) for solver in solvers})
+    else:
+        def count():
+            n_files = sum(1 for _ in files)
+            progress.expect({solver: n_files for solver in solvers})
+
+        threading.Thread(target=count, daemon=True).start()
+
+
+def run_worker(args) -> None:
+    """
+    Run jobs handed out by a coordinator, the solver commands come from the local config
+    """
+    measure = MEASURE_BACKENDS[args.measure]
+    if args.memory_limit:
+        measure = partial(measure, memory_limit=args.memory_limit * 1024)
+
+    run_job = partial(measure_job, measure=measure, repeats=args.repeat, target_ci=args.target_ci, min_repeats=args.min_repeats)
+    distributed.work(args.worker, args.jobs, run_job, read_config(), pinned=args.pin, token=args.token,
+                     cores_per_job=args.cores_per_job, avoid_smt=args.avoid_smt)
+
 
 def run(args) -> None:
+    if args.worker:
+        run_worker(args)
+        return
+
+    if args.path is None:
+        print("The path to the benchmarks is required, except for --worker")
+        return
+
     solvers_to_run: list[str] = args.solvers
     solver_dict = read_config()
     cast(Dict[str, List[str]], solver_dict)
 
+    if args.no_cache and (args.cache_only or args.invalidate):
+        print("--cache-only and --invalidate can not be used with --no-cache")
+        return
+
     # Make sure we have a config for all specified solvers
     if not args.solvers[0] == "all":  # All just runs all from the config
         for solver in solvers_to_run:
@@ -98,29 +514,190 @@ def run(args) -> None:
         print("No solver was selected")
         return
 
-    pools = [LazyPathIterator(args.path, args.skip) for _ in selected_solvers]
-
-    threads = []
-    for (name, command), pool in zip(selected_solvers, pools):
+    for name, _ in selected_solvers:
         print(f"[+] Starting solver {name}")
-        threads.append(threading.Thread(target=worker, args=((name, command), pool)))
 
-    for thread in threads:
-        thread.start()
+    store = ResultStore(os.path.join(OUTPUT_DIR, RESULTS_DIR))
 
-    for thread in threads:
-        thread.join()
+    memory_limit = args.memory_limit * 1024 if args.memory_limit else None  # KiB
+    measure = MEASURE_BACKENDS[args.measure]
+    if memory_limit:
+        print(f"[+] Limiting the memory of every job to {args.memory_limit} MiB")
+        measure = partial(measure, memory_limit=memory_limit)
+
+    files: Iterable[str] = LazyPathIterator(args.path, args.skip)
+    if args.dedup:
+        print("[+] Deduplicating benchmarks")
+        files, aliases, hashes = deduplicate(files, args.jobs)
+        print(f"[+] {len(files)} of {len(files) + len(aliases)} benchmarks are unique")
+
+        for alias, representative in aliases.items():
+            store.add_alias(alias, representative)
+
+        # Equivalent benchmarks share their ledger entries, also across campaigns
+        ledger = Ledger(os.path.join(OUTPUT_DIR, LEDGER_FILE), TIMEOUT, hash_file=canonical_hash, memory_limit=memory_limit)
+        ledger.hashes.update(hashes)
+    else:
+        ledger = Ledger(os.path.join(OUTPUT_DIR, LEDGER_FILE), TIMEOUT, memory_limit=memory_limit)
+
+    jobs: Iterable[Job] = generate_jobs(selected_solvers, files)
+    if args.resume:
+        print("[+] Resuming, only running missing, failed or stale jobs")
+        # Benchmarks that were measured under another path share the result of that path
+        jobs = ledger.pending(jobs, lambda job, measured: store.add_alias(job[2], measured, job[0]))
+
+    if args.longest_first:
+        print("[+] Ordering jobs longest expected first")
+        jobs = longest_first(jobs)
+
+    print(f"[+] Running with {args.jobs} parallel jobs")
+    print(f"[+] Measuring with the {args.measure} backend")
+
+    cache = None
+    if not args.no_cache:
+        cache = ResultCache(args.cache or os.path.join(OUTPUT_DIR, CACHE_FILE), TIMEOUT, memory_limit, args.measure)
+        for solver in args.invalidate or []:
+            print(f"[+] Invalidated {cache.invalidate(solver)} cached results of {solver}")
+        if args.cache_only:
+            print("[+] Only reusing cached results, no solver is run")
+
+    progress = Progress([name for name, _ in selected_solvers])
+    store.observers.append(progress.record)
+    count_jobs(progress, jobs, LazyPathIterator(args.path, args.skip) if not isinstance(files, list) else files,
+               [name for name, _ in selected_solvers])
+    reporter = Reporter(progress, args.status or os.path.join(OUTPUT_DIR, STATUS_FILE), args.status_interval, args.metrics_port)
+    reporter.start()
+
+    # Every race runs all solvers at once, keep the number of solver processes at --jobs
+    n_workers = max(1, args.jobs // len(selected_solvers)) if args.race else args.jobs
+    placements = None
+    if args.pin:
+        # A race runs all solvers at once, every solver gets its own cores
+        cores_per_worker = args.cores_per_job * (len(selected_solvers) if args.race else 1)
+        placements = core_sets(n_workers, cores_per_worker, args.avoid_smt)
+        if not placements:
+            print(f"Not enough cpus to give each job {cores_per_worker} dedicated cores")
+            return
+        if len(placements) < n_workers:
+            print(f"[+] Only enough cpus for {len(placements)} pinned workers")
+        print(f"[+] Pinning workers to the cores {', '.join(str(sorted(cores)) for cores in placements)}")
+        spare = avoid(placements)
+        if spare:
+            print(f"[+] The runner itself uses the cores {sorted(spare)}")
+        else:
+            print("[+] No core left for the runner itself, its watchdogs share the cores of the jobs")
+
+    if args.coordinator:
+        if args.race:
+            print("--race can not be used with --coordinator")
+        else:
+            try:
+                distributed.serve(args.coordinator, jobs, ledger, partial(store_record, store), progress, args.token)
+            except ValueError as e:
+                print(f"{e}, pass --token or set {TOKEN_VARIABLE}")
+    elif args.race:
+        print(f"[+] Racing the solvers on {n_workers} benchmarks at once, quorum {args.quorum}"
+              + (f", stopping solvers slower than {args.race_factor}x the fastest" if args.race_factor else ""))
+
+        run_race = partial(race_solvers, store=store, measure=measure, cache=cache,
+                           cache_only=args.cache_only, quorum=args.quorum, factor=args.race_factor, pinned=args.pin)
+        schedule(group_by_file(jobs), n_workers, ledger, run_race, target=race_worker, placements=placements, progress=progress)
+    else:
+        run_job = partial(benchmark_solver, store=store, measure=measure, cache=cache, cache_only=args.cache_only,
+                          repeats=args.repeat, target_ci=args.target_ci, min_repeats=args.min_repeats)
+        schedule(jobs, n_workers, ledger, run_job, placements=placements, progress=progress)
+
+    reporter.close()
+    store.close()
+    ledger.close()
+    if cache is not None:
+        cache.close()
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Run smt solvers on a given benchmark set")
     parser.add_argument("--skip", type=int, default=0, help="Number of benchmark files to skip")
+    parser.add_argument("--measure",
+                        type=str,
+                        choices=list(MEASURE_BACKENDS.keys()),
+                        default="rusage",
+                        help="How to measure the solvers, rusage collects times, memory and context switches from the kernel, "
+                             "perf wraps each run in `perf stat` for hardware counters (default: rusage)")
+    parser.add_argument("--dedup",
+                        action="store_true",
+                        help="Run benchmarks that only differ in whitespace or comments only once, their results are shared")
+    parser.add_argument("--cache",
+                        type=str,
+                        help=f"Path of the result cache, shared between runs and campaigns (default: {os.path.join(OUTPUT_DIR, CACHE_FILE)})")
+    parser.add_argument("--no-cache", action="store_true", help="Always run the solvers, neither reuse nor cache results")
+    parser.add_argument("--cache-only",
+                        action="store_true",
+                        help="Never run a solver, only reuse cached results, jobs without cached result are marked as failed")
+    parser.add_argument("--invalidate",
+                        type=str,
+                        nargs="+",
+                        help="Drop the cached results of these solvers before running")
+    parser.add_argument("--resume",
+                        action="store_true",
+                        help="Only run jobs that are missing, failed or stale in the job ledger of previous runs")
+    parser.add_argument("--jobs", "-j", type=int, default=os.cpu_count() or 1, help="Number of solver runs to execute in parallel (default: number of cores)")
+    parser.add_argument("--longest-first",
+                        action="store_true",
+                        help="Start the jobs with the longest expected runtime first, estimated by the benchmark file size")
+    parser.add_argument("--pin",
+                        action="store_true",
+                        help="Pin every parallel job to its own dedicated cores, so jobs don't compete for the same core")
+    parser.add_argument("--cores-per-job", type=int, default=1, help="With --pin, the number of cores every job gets (default: 1)")
+    parser.add_argument("--avoid-smt",
+                        action="store_true",
+                        help="With --pin, only use one hyperthread of every physical core")
+    parser.add_argument("--memory-limit",
+                        type=int,
+                        help="Kill jobs whose processes together use more memory than this many MiB, they are recorded as Memout")
+    parser.add_argument("--repeat",
+                        type=int,
+                        default=1,
+                        help="Run every successful job up to this many times, the median is used as its time and mean, "
+                             "median and dispersion are recorded, timeouts and errors are not repeated (default: 1)")
+    parser.add_argument("--target-ci",
+                        type=float,
+                        help="With --repeat, stop repeating once the 95%% confidence interval of the mean is within this fraction "
+                             "of the mean on either side, eg. 0.05")
+    parser.add_argument("--min-repeats",
+                        type=int,
+                        default=MIN_REPEATS,
+                        help=f"With --target-ci, the minimum number of runs (default: {MIN_REPEATS})")
+    parser.add_argument("--race",
+                        action="store_true",
+                        help="Run all solvers on a benchmark at once and stop the rest early, stopped runs are recorded as censored timeouts")
+    parser.add_argument("--quorum", type=int, default=1, help="In race mode, stop once this many solvers agree on sat/unsat (default: 1)")
+    parser.add_argument("--race-factor",
+                        type=float,
+                        help="In race mode, stop the solvers running longer than this factor times the fastest answer")
     parser.add_argument("--solvers",
                         type=str,
                         nargs="+",
                         default=["all"],
                         help="Define which solvers to run from your config.json")
-    parser.add_argument("path", type=str, help="Path to the directory containing the benchmarks")
+    parser.add_argument("--status",
+                        type=str,
+                        help=f"Path of the status file with live progress metrics (default: {os.path.join(OUTPUT_DIR, STATUS_FILE)})")
+    parser.add_argument("--status-interval", type=float, default=10, help="Seconds between updates of the status file and the progress line (default: 10)")
+    parser.add_argument("--metrics-port", type=int, help="Serve the progress metrics in the Prometheus text format on this local port")
+    parser.add_argument("--coordinator",
+                        type=str,
+                        help="Don't run the jobs, hand them out to workers connecting to this address(host:port or unix:/path) "
+                             "and store their results")
+    parser.add_argument("--worker",
+                        type=str,
+                        help="Run the jobs of the coordinator at this address(host:port or unix:/path), "
+                             "the benchmarks must be reachable under the same path as on the coordinator")
+    parser.add_argument("--token",
+                        type=str,
+                        default=os.environ.get(TOKEN_VARIABLE),
+                        help=f"Shared secret of the coordinator and its workers, required to listen on anything but localhost "
+                             f"or a unix socket (default: ${TOKEN_VARIABLE}, preferred since arguments are visible to other users)")
+    parser.add_argument("path", type=str, nargs="?", help="Path to the directory containing the benchmarks")
     args = parser.parse_args()
 
     run(args)
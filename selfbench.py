@@ -0,0 +1,295 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+import dataparser
+import tag_util
+import visualizer
+from dataparser import TAGFILE
+
+# Benchmarks of the toolkit itself: the parser, tag resolution, tag filtering and the summary table
+# are timed on synthetic data of growing size, results are appended to a history file for regression comparison
+
+STAGES = ["parse_files", "tag_directory", "find_exact_tagset", "summary_table"]
+SCALES = [1000, 5000, 20000]  # Numbers of problems
+SOLVERS = 5
+REPEATS = 3  # Timed runs per stage and scale, the minimum is compared
+FAMILIES = 20  # Benchmark families(directories) the problems are spread over
+GROUPS = 4  # Top level directories the families are spread over
+CUSTOMIZED = 10  # Every CUSTOMIZED-th problem gets customized tags
+TIMEOUT_MS = 60000
+ERROR_RATE = 0.02
+HISTORY_FILE = "selfbench.jsonl"
+THRESHOLD = 1.25  # Slowdown of the minimum time that counts as regression
+
+
+############ SYNTHETIC DATA ############
+
+def solver_names(n_solvers: int) -> List[str]:
+    return [f"solver{i}" for i in range(n_solvers)]  # No _, it separates problem and solver in .out names
+
+
+def problem_path(i: int) -> str:
+    family = i % FAMILIES
+    return f"group{family % GROUPS}/family{family:02d}/problem{i:07d}"
+
+
+def problem_tags(i: int) -> Tuple[str, ...]:
+    """
+    The tags of the i-th problem, the same as resolved from the tag tree written by write_tag_tree
+    """
+    family = i % FAMILIES
+    if i % CUSTOMIZED == 0:
+        return ("custom", f"logic{family % 3}")
+    return (f"group{family % GROUPS}", f"logic{family % 3}", f"ops{family % 5}")
+
+
+def synthetic_results(n_problems: int, n_solvers: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Results of n_solvers solvers on n_problems problems in the parsed schema
+    Every problem has a lognormal difficulty, every solver a speed factor, runs above the timeout are timeouts
+    """
+    rng = np.random.default_rng(seed)
+    difficulty = rng.lognormal(mean=6, sigma=2.5, size=n_problems)
+    factor = rng.uniform(0.5, 2, size=n_solvers)
+    answer = np.where(rng.random(n_problems) < 0.5, "sat", "unsat")
+
+    times = (difficulty[:, None] * factor[None, :] * rng.lognormal(sigma=0.2, size=(n_problems, n_solvers))).ravel()
+    status = np.where(times > TIMEOUT_MS, "Timeout", "Success").astype(object)
+    status[(rng.random(times.size) < ERROR_RATE) & (status == "Success")] = "Error"
+    success = status == "Success"
+
+    df = pd.DataFrame({
+        "problem": np.repeat([problem_path(i) for i in range(n_problems)], n_solvers),
+        "solver": np.tile(solver_names(n_solvers), n_problems),
+        "status": status,
+        "sanity_sat": np.where(success, np.repeat(answer, n_solvers), None),
+        "task-clock:u": np.where(success, times, np.nan),
+    })
+    return dataparser.apply_dtypes(df)
+
+
+def synthetic_tags(n_problems: int) -> pd.DataFrame:
+    return pd.DataFrame([(problem_path(i), tag) for i in range(n_problems) for tag in problem_tags(i)], columns=["problem", "tags"])
+
+
+def perf_block(command: str, task_clock: float) -> str:
+    seconds = task_clock / 1000
+    return (f" Performance counter stats for '{command}':\n\n"
+            f"          {task_clock:,.2f} msec task-clock:u                #    0.998 CPUs utilized\n"
+            f"                 0      context-switches:u               #    0.000 /sec\n"
+            f"                 0      cpu-migrations:u                 #    0.000 /sec\n"
+            f"             {int(task_clock * 3):,}      page-faults:u    #    2.000 K/sec\n"
+            f"     {int(task_clock * 3e6):,}      cycles:u                #    3.000 GHz\n"
+            f"     {int(task_clock * 5e6):,}      instructions:u          #    1.67  insn per cycle\n\n"
+            f"       {seconds * 1.002:.9f} seconds time elapsed\n\n"
+            f"       {seconds:.6f} seconds user\n"
+            f"       {seconds * 0.01:.6f} seconds sys\n")
+
+
+def write_out_files(directory: str, df: pd.DataFrame) -> List[str]:
+    """
+    Write the results as .out files of the legacy runner, one per problem and solver
+    :returns The paths of the written files
+    """
+    files = []
+    for problem, solver, status, answer, task_clock in df[["problem", "solver", "status", "sanity_sat", "task-clock:u"]].itertuples(index=False):
+        path = os.path.join(directory, f"{problem}.smt2_{solver}.out")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        if status == "Success":
+            content = f"0\n{answer}\n{perf_block(f'{solver} {problem}.smt2', task_clock)}"
+        elif status == "Timeout":
+            content = "timeout\n"
+        else:
+            content = "1\n(error \"synthetic error\")\n"
+
+        with open(path, "w") as f:
+            f.write(content)
+        files.append(path)
+
+    return files
+
+
+def write_tag_tree(directory: str, n_problems: int):
+    """
+    Write the benchmark tree of n_problems empty problems, with a tagfile in every group and family directory
+    The tags resolve to the same tags as synthetic_tags
+    """
+    customized: Dict[str, List[Dict[str, List[str]]]] = {}
+    for i in range(n_problems):
+        path = os.path.join(directory, f"{problem_path(i)}.smt2")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        open(path, "w").close()
+
+        family_directory = os.path.dirname(path)
+        customized.setdefault(family_directory, [])
+        if i % CUSTOMIZED == 0:
+            customized[family_directory].append({os.path.basename(path): list(problem_tags(i))})
+
+    for group in range(GROUPS):
+        group_directory = os.path.join(directory, f"group{group}")
+        if os.path.isdir(group_directory):
+            with open(os.path.join(group_directory, TAGFILE), "w") as f:
+                json.dump({"add": [f"group{group}"]}, f)
+
+    for family in range(FAMILIES):
+        family_directory = os.path.join(directory, f"group{family % GROUPS}", f"family{family:02d}")
+        if family_directory in customized:
+            with open(os.path.join(family_directory, TAGFILE), "w") as f:
+                json.dump({"add": [f"logic{family % 3}", f"ops{family % 5}"], "customize": customized[family_directory]}, f)
+
+
+############ TIMING ############
+
+def time_stage(function: Callable[[], Any], repeats: int) -> List[float]:
+    """
+    :returns The wall time of every run in seconds, output of the function is discarded
+    """
+    times = []
+    for _ in range(repeats):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            function()
+            times.append(time.perf_counter() - start)
+    return times
+
+
+def common_tagset(tags: pd.DataFrame) -> frozenset:
+    index = tag_util.TagIndex(tags)
+    return index.tagsets[int(np.bincount(index.tagset_ids).argmax())]
+
+
+def run_scale(n_problems: int, n_solvers: int, repeats: int, stages: List[str]) -> List[Dict[str, Any]]:
+    """
+    Generate the data of one scale and time the selected stages on it, the generation itself is not timed
+    """
+    df = synthetic_results(n_problems, n_solvers)
+    tags = synthetic_tags(n_problems)
+    tagset = common_tagset(tags)
+
+    results = []
+
+    def record(stage: str, times: List[float]):
+        results.append({"stage": stage, "problems": n_problems, "rows": len(df),
+                        "min": min(times), "median": statistics.median(times), "times": times})
+        print(f"[+] {stage:<20} {n_problems:>9} problems  min {min(times):9.4f}s  median {statistics.median(times):9.4f}s")
+
+    with tempfile.TemporaryDirectory(prefix="selfbench-") as directory:
+        if "parse_files" in stages:
+            files = write_out_files(os.path.join(directory, "out"), df)
+            record("parse_files", time_stage(lambda: dataparser.parse_files(files), repeats))
+
+        if "tag_directory" in stages:
+            write_tag_tree(os.path.join(directory, "benchmarks"), n_problems)
+            record("tag_directory", time_stage(lambda: dataparser.tag_directory(os.path.join(directory, "benchmarks")), repeats))
+
+    if "find_exact_tagset" in stages:
+        record("find_exact_tagset", time_stage(lambda: tag_util.find_exact_tagset(df, tags, tagset), repeats))
+
+    if "summary_table" in stages:
+        record("summary_table", time_stage(lambda: visualizer.summary_table(df), repeats))
+
+    return results
+
+
+############ HISTORY ############
+
+def current_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_history(path: str) -> List[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return []
+    with open(path, "r") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def append_history(path: str, entry: Dict[str, Any]):
+    with open(path, "a") as f:
+        f.write(json.dumps(entry) + "\n")
+
+
+def compare(entry: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[Tuple[str, int, float]]:
+    """
+    Compare the minimum times of the stages and scales both runs measured
+    :returns The regressions, as (stage, problems, slowdown) for every stage slower than threshold times the baseline
+    """
+    old = {(result["stage"], result["problems"]): result["min"] for result in baseline["results"]}
+
+    print(f"[+] Comparing with the run of {baseline['time']}(commit {baseline.get('commit') or 'unknown'})")
+    regressions = []
+    for result in entry["results"]:
+        key = (result["stage"], result["problems"])
+        if key not in old or old[key] <= 0:
+            continue
+
+        ratio = result["min"] / old[key]
+        marker = "  REGRESSION" if ratio > threshold else ""
+        print(f"    {result['stage']:<20} {result['problems']:>9} problems  {old[key]:9.4f}s -> {result['min']:9.4f}s  x{ratio:.2f}{marker}")
+        if ratio > threshold:
+            regressions.append((result["stage"], result["problems"], ratio))
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the parser, tag resolution, tag filtering and summary table on synthetic data of growing size")
+    parser.add_argument("--scales", type=int, nargs="+", default=SCALES, help=f"Numbers of problems to benchmark (default: {' '.join(map(str, SCALES))})")
+    parser.add_argument("--solvers", type=int, default=SOLVERS, help=f"Number of solvers, every problem has one result per solver (default: {SOLVERS})")
+    parser.add_argument("--repeats", type=int, default=REPEATS, help=f"Timed runs per stage and scale, the minimum is compared (default: {REPEATS})")
+    parser.add_argument("--stages", type=str, nargs="+", choices=STAGES, default=STAGES, help="Stages to benchmark (default: all)")
+    parser.add_argument("--history", type=str, default=HISTORY_FILE, help=f"File the results are appended to (default: {HISTORY_FILE})")
+    parser.add_argument("--baseline", type=str, help="Compare with the last run stored in this file instead of the last run in the history")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help=f"Slowdown that counts as regression, exits with 1 if any stage regressed (default: {THRESHOLD})")
+    parser.add_argument("--no-store", action="store_true", help="Only compare, don't append the results to the history")
+    args = parser.parse_args()
+
+    results = []
+    for n_problems in sorted(args.scales):
+        results.extend(run_scale(n_problems, args.solvers, args.repeats, args.stages))
+
+    entry = {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": current_commit(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "solvers": args.solvers,
+        "repeats": args.repeats,
+        "results": results,
+    }
+
+    # Only runs with the same number of solvers are comparable, the rows per scale differ otherwise
+    history = [e for e in load_history(args.baseline or args.history) if e["solvers"] == args.solvers]
+    regressions = compare(entry, history[-1], args.threshold) if history else []
+    if not history:
+        print("[+] No earlier run to compare with")
+
+    if not args.no_store:
+        append_history(args.history, entry)
+        print(f"[+] Appended the results to {args.history}")
+
+    if regressions:
+        print(f"[+] {len(regressions)} stages regressed by more than x{args.threshold}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
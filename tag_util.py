@@ -1,8 +1,129 @@
-import os
-from typing import Dict, List, Set, Tuple
-import json
 import pandas as pd
-import argparse
+import numpy as np
+
+
+class TagIndex:
+    """
+    Index of the tags of every problem, built once from the TAGS DataFrame
+
+    The tags of each problem are stored as bitmap, every tag is a bit position and every problem a row.
+    Having/exact/unique tagset queries are vectorized bit operations over all problems at once.
+
+    Parameters:
+    - TAGS (DataFrame): A DataFrame that maps problems to their tags. It should contain at least two columns:
+                        'problem' (the identifier of the problem) and 'tags' (the associated tag).
+    """
+
+    def __init__(self, TAGS):
+        problems = TAGS["problem"].astype("category").cat
+        tags = TAGS["tags"].astype("category").cat
+
+        self.problems = problems.categories
+        self.tags = list(tags.categories)
+        self.bits = {tag: i for i, tag in enumerate(self.tags)}
+
+        # Every row holds the bits of one problem, split into 64 bit words
+        words = max(1, (len(self.tags) + 63) // 64)
+        self.masks = np.zeros((len(self.problems), words), dtype=np.uint64)
+
+        tag_codes = tags.codes.to_numpy().astype(np.int64)
+        np.bitwise_or.at(
+            self.masks,
+            (problems.codes.to_numpy(), tag_codes // 64),
+            np.left_shift(np.uint64(1), (tag_codes % 64).astype(np.uint64)),
+        )
+
+        # Map every problem to its tagset, each distinct tagset is decoded only once
+        unique_masks, inverse = np.unique(self.masks, axis=0, return_inverse=True)
+        self.tagsets = [self._decode(mask) for mask in unique_masks]
+        self.tagset_ids = inverse.reshape(-1)  # The position in self.tagsets of the tagset of every problem
+        self.problem_tags = {problem: self.tagsets[i] for problem, i in zip(self.problems, self.tagset_ids)}
+
+    def _decode(self, mask) -> frozenset:
+        return frozenset(tag for tag, bit in self.bits.items() if int(mask[bit // 64]) >> (bit % 64) & 1)
+
+    def _encode(self, tagset):
+        """
+        :returns The bitmap of the tagset, or None if it contains tags that no problem has
+        """
+        if not all(tag in self.bits for tag in tagset):
+            return None
+
+        mask = np.zeros(self.masks.shape[1], dtype=np.uint64)
+        for tag in tagset:
+            bit = self.bits[tag]
+            mask[bit // 64] |= np.uint64(1) << np.uint64(bit % 64)
+        return mask
+
+    def having(self, tagset):
+        """
+        :returns A boolean array over all problems, True for problems having all tags in `tagset`,
+                 all False for an empty `tagset`
+        """
+        mask = self._encode(tagset)
+        if mask is None or not tagset:
+            return np.zeros(len(self.problems), dtype=bool)
+        return ((self.masks & mask) == mask).all(axis=1)
+
+    def exact(self, tagset):
+        """
+        :returns A boolean array over all problems, True for problems whose tags exactly match `tagset`
+        """
+        mask = self._encode(tagset)
+        if mask is None:
+            return np.zeros(len(self.problems), dtype=bool)
+        return (self.masks == mask).all(axis=1)
+
+    def unique_tagsets(self):
+        """
+        :returns A list of the unique tagsets, in the order of the problems they first appear at
+        """
+        _, first = np.unique(self.masks, axis=0, return_index=True)
+        return [set(self._decode(self.masks[i])) for i in np.sort(first)]
+
+    def positions(self, df):
+        """
+        :returns The position of the problem of every row of `df` in the index, -1 for problems without tags
+
+        For a categorical problem column only the categories are looked up in the index,
+        the rows are then mapped through the integer codes.
+        """
+        problem = df["problem"]
+        if len(self.problems) == 0:
+            return np.full(len(df), -1, dtype=np.int64)
+
+        if isinstance(problem.dtype, pd.CategoricalDtype):
+            category_positions = self.problems.get_indexer(problem.cat.categories)
+            codes = problem.cat.codes.to_numpy()
+            return np.where(codes >= 0, category_positions[codes], -1)
+
+        return self.problems.get_indexer(problem)
+
+    def select(self, df, selected):
+        """
+        Filter the DataFrame `df` to the problems selected by a boolean array over all problems
+        """
+        positions = self.positions(df)
+        tagged = positions >= 0
+        keep = np.zeros(len(df), dtype=bool)
+        keep[tagged] = selected[positions[tagged]]
+        return df[keep]
+
+    def tagset_codes(self, df):
+        """
+        :returns The position in self.tagsets of the tagset of every row of `df`, -1 for problems without tags
+        """
+        positions = self.positions(df)
+        codes = np.full(len(df), -1, dtype=np.int64)
+        codes[positions >= 0] = self.tagset_ids[positions[positions >= 0]]
+        return codes
+
+
+def tag_index(TAGS):
+    """
+    Get a TagIndex for TAGS, which may already be one
+    """
+    return TAGS if isinstance(TAGS, TagIndex) else TagIndex(TAGS)
 
 
 def find_having_tags(df, TAGS, tagset):
@@ -11,26 +132,16 @@ def find_having_tags(df, TAGS, tagset):
 
     Parameters:
     - df (DataFrame): The main DataFrame containing problem data. It is assumed that it has a column named 'problem'.
-    - TAGS (DataFrame): A DataFrame that maps problems to their tags. It should contain at least two columns: 
+    - TAGS (DataFrame or TagIndex): A DataFrame that maps problems to their tags. It should contain at least two columns: 
                         'problem' (the identifier of the problem) and 'tags' (the associated tag).
+                        Pass a prebuilt TagIndex when filtering several times.
     - tagset (set): A set of tags that each problem must include.
 
     Returns:
-    - DataFrame: A subset of `df` containing only the problems that include all tags in `tagset`.
+    - DataFrame: A subset of `df` containing only the problems that include all tags in `tagset`, empty for an empty `tagset`.
     """
-    filtered_tags = TAGS[TAGS['tags'].isin(list(tagset))]
-
-    # Group by 'problem' and find problems with both tags
-    problems_with_both_tags = (
-        filtered_tags.groupby("problem")["tags"]
-        .apply(set)  # Get unique tags for each problem
-        .apply(lambda t: tagset.issubset(t))
-    )
-
-    # Get problems that satisfy the condition
-    matching_problems = problems_with_both_tags[problems_with_both_tags].index
-
-    return df[df['problem'].isin(matching_problems)]
+    index = tag_index(TAGS)
+    return index.select(df, index.having(tagset))
 
 
 def find_exact_tagset(df, TAGS, tagset):
@@ -39,23 +150,15 @@ def find_exact_tagset(df, TAGS, tagset):
 
     Parameters:
     - df (DataFrame): The main DataFrame containing problem data, expected to have a column named 'problem'.
-    - TAGS (DataFrame): A DataFrame that associates problems with their tags. Must contain 'problem' and 'tags' columns.
+    - TAGS (DataFrame or TagIndex): A DataFrame that associates problems with their tags. Must contain 'problem' and 'tags' columns.
+                                    Pass a prebuilt TagIndex when filtering several times.
     - tagset (set): The exact set of tags that a problem must have to be considered a match.
 
     Returns:
     - DataFrame: A subset of `df` containing only the problems whose set of tags exactly matches `tagset`.
     """
-    # Group by 'problem' and collect unique tags for each problem
-    problem_to_tags = (
-        TAGS.groupby("problem")["tags"]
-        .apply(set)  # Get unique tags as a set for each problem
-    )
-
-    # Find problems where the tags exactly match the given tagset
-    matching_problems = problem_to_tags[problem_to_tags == tagset].index
-
-    # Filter the original dataframe for these problems
-    return df[df['problem'].isin(matching_problems)]
+    index = tag_index(TAGS)
+    return index.select(df, index.exact(tagset))
 
 
 def get_unique_tagsets(TAGS):
@@ -63,21 +166,51 @@ def get_unique_tagsets(TAGS):
     Get a list of unique tag sets across all problems in the TAGS DataFrame.
 
     Parameters:
-    - TAGS (DataFrame): A DataFrame that contains problem-tag mappings, with at least the columns 'problem' and 'tags'.
+    - TAGS (DataFrame or TagIndex): A DataFrame that contains problem-tag mappings, with at least the columns 'problem' and 'tags'.
 
     Returns:
     - list: A list of unique tag sets (as Python sets), where each set represents the unique tags associated with a problem.
     """
-    # Group by 'problem' and collect unique tags as sets
-    problem_to_tags = (
-        TAGS.groupby("problem")["tags"]
-        .apply(set)  # Get unique tags as a set for each problem
-    )
+    return tag_index(TAGS).unique_tagsets()
+
+
+def tagset_label(tagset):
+    return ", ".join(sorted(tagset))
+
+
+def with_tagsets(df, TAGS, column="tagset"):
+    """
+    Add a column holding the tagset of each problem to the DataFrame `df`, in a single pass.
 
-    # Extract unique tagsets
-    unique_tagsets = problem_to_tags.drop_duplicates().tolist()
+    Parameters:
+    - df (DataFrame): The main DataFrame containing problem data, expected to have a column named 'problem'.
+    - TAGS (DataFrame or TagIndex): A DataFrame that associates problems with their tags. Must contain 'problem' and 'tags' columns.
+    - column (str): The name of the added column.
+
+    Returns:
+    - DataFrame: A copy of `df` with a categorical column of tagset labels (the sorted tags joined by ", "),
+                 problems without tags have no tagset. Group by this column to compute anything for every tagset at once.
+    """
+    index = tag_index(TAGS)
+    labels = [tagset_label(tagset) for tagset in index.tagsets]
+    return df.assign(**{column: pd.Categorical.from_codes(index.tagset_codes(df), categories=labels)})
 
-    return unique_tagsets
+
+def split_by_tagset(df, TAGS):
+    """
+    Split the DataFrame `df` into one partition per exact tagset, in a single pass.
+
+    Parameters:
+    - df (DataFrame): The main DataFrame containing problem data, expected to have a column named 'problem'.
+    - TAGS (DataFrame or TagIndex): A DataFrame that associates problems with their tags. Must contain 'problem' and 'tags' columns.
+
+    Returns:
+    - dict: Maps every tagset (as frozenset) to the subset of `df` whose problems have exactly these tags,
+            tagsets without any rows in `df` are left out. Each partition equals `find_exact_tagset(df, TAGS, tagset)`.
+    """
+    index = tag_index(TAGS)
+    codes = index.tagset_codes(df)
+    return {index.tagsets[code]: partition for code, partition in df.groupby(codes) if code >= 0}
 
 
 if __name__ == "__main__":
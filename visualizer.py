@@ -1,15 +1,27 @@
 import matplotlib.pyplot as plt
+import numpy as np
 import pandas as pd
 import seaborn as sns
 from matplotlib.colors import LogNorm
 import matplotlib
 
 import argparse
+import os
 import sys
 
+import dataparser
+import portfolio
+
+# The columns all plots and tables are based on, only these are loaded from the parsed results
+COLUMNS = ["problem", "solver", "status", "sanity_sat", "task-clock:u", "task_clock_std", "task_clock_ci", "censored"]
+
+HEATMAP_ROWS = 400  # Rows of the binned heatmap
+SCATTER_GRID = (600, 150)  # Columns(problems) and rows(time) of the binned scatter plot
+MAX_GROUP_LABELS = 40  # More groups are drawn without labels
+
 
 def count_timeouts(df):
-    timeout_counts = df[df['status'] == 'Timeout'].groupby('solver').size()
+    timeout_counts = df[df['status'] == 'Timeout'].groupby('solver', observed=True).size()
     if timeout_counts.empty:
         print("Timeouts: 0")
     else:
@@ -18,7 +30,7 @@ def count_timeouts(df):
 
 
 def count_errors(df):
-    error_counts = df[df['status'] == 'Error'].groupby('solver').size()
+    error_counts = df[df['status'] == 'Error'].groupby('solver', observed=True).size()
     if error_counts.empty:
         print("Errors: 0")
     else:
@@ -31,7 +43,7 @@ def total_time(df):
     print("Total time used(in ms user time):")
 
     # Group by 'solver' and sum 'task-clock:u'
-    task_clock_sum = df.groupby('solver')['task-clock:u'].sum()
+    task_clock_sum = df.groupby('solver', observed=True)['task-clock:u'].sum()
 
     print(task_clock_sum.to_string(index=True))
 
@@ -85,27 +97,220 @@ def scatter(df):
     return fig
 
 
-def summary_table(df):
-    # Create a copy to avoid modifying the original DataFrame
-    df = df.copy()
+def runtime_grid(df):
+    """
+    The problem x solver matrix of 'task-clock:u', built from the category codes instead of a pivot
+    :returns The problems (rows), the solvers (columns) and the matrix, NaN where there is no time
+    """
+    problems = pd.Categorical(df['problem'])
+    solvers = pd.Categorical(df['solver'])
+    problems = problems.remove_unused_categories()
+    solvers = solvers.remove_unused_categories()
+
+    grid = np.full((len(problems.categories), len(solvers.categories)), np.nan)
+    grid[problems.codes, solvers.codes] = pd.to_numeric(df['task-clock:u'], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+
+    return problems.categories, solvers.categories, grid
+
+
+def problem_groups(df, problems, by):
+    """
+    The group of every problem, "family" is the directory of the problem, "quantile" puts all problems into one group
+    Any other value is the name of a column holding the group, eg. "tagset" (see tag_util.with_tagsets)
+    """
+    if by == 'quantile':
+        return np.zeros(len(problems), dtype=np.int64), ['all']
+
+    if by == 'family':
+        labels = pd.Index([os.path.dirname(str(problem)) or '.' for problem in problems])
+    else:
+        values = df.drop_duplicates('problem').set_index('problem')[by].reindex(problems)
+        labels = pd.Index(values.astype(object).where(values.notna(), 'none').astype(str))
+
+    codes, uniques = pd.factorize(labels, sort=True)
+    return codes, list(uniques)
+
+
+def binned_order(df, by, resolution):
+    """
+    Sort the problems by group and by the time of the fastest solver inside each group,
+    and assign them to at most `resolution` bins, every group gets bins in proportion to its size(at least one)
+    :returns The solvers, the sorted problem x solver matrix, the bin of every sorted problem, the group labels,
+    the first bin and the first (sorted) problem of every group
+    """
+    problems, solvers, grid = runtime_grid(df)
+    groups, labels = problem_groups(df, problems, by)
+
+    best = np.where(np.isnan(grid), np.inf, grid).min(axis=1) if grid.shape[1] else np.zeros(len(problems))
+    order = np.lexsort((best, groups))
+    grid, groups = grid[order], groups[order]
+
+    sizes = np.bincount(groups, minlength=len(labels))
+    rows = np.maximum(1, np.round(sizes * min(resolution, len(problems)) / max(len(problems), 1))).astype(np.int64)
+    rows = np.minimum(rows, np.maximum(sizes, 1))
+    first_bin = np.concatenate([[0], np.cumsum(rows)[:-1]])
+    first_problem = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+
+    rank = np.arange(len(groups)) - first_problem[groups]
+    bins = first_bin[groups] + rank * rows[groups] // np.maximum(sizes[groups], 1)
+
+    return solvers, grid, bins, labels, first_bin, first_problem
+
+
+def binned_heatmap(data_frame, by='family', resolution=HEATMAP_ROWS):
+    """
+    Heatmap of the problems aggregated into at most `resolution` rows, so the rendering cost does not depend on the number of problems
+    Every row is the geometric mean time of the problems in its bin, the problems are grouped by `by`(see problem_groups)
+    and sorted by the time of the fastest solver, bins without any time are purple
+    """
+    solvers, grid, bins, labels, first_bin, _ = binned_order(data_frame, by, resolution)
+    n_bins = int(bins.max()) + 1 if len(bins) else 0
+
+    # Geometric mean per bin and solver, as sums of the logarithms
+    logs = np.log10(np.clip(grid, 1e-3, None))
+    image = np.full((n_bins, len(solvers)), np.nan)
+    for i in range(len(solvers)):
+        measured = ~np.isnan(logs[:, i])
+        counts = np.bincount(bins[measured], minlength=n_bins)
+        sums = np.bincount(bins[measured], weights=logs[measured, i], minlength=n_bins)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            image[:, i] = 10 ** (sums / counts)
+
+    cmap = sns.color_palette("crest", as_cmap=True).copy()
+    cmap.set_bad('purple')
+
+    fig, ax = plt.subplots(figsize=(12, 8))
+    mesh = ax.imshow(np.ma.masked_invalid(image), aspect='auto', interpolation='nearest', cmap=cmap, norm=LogNorm())
+    fig.colorbar(mesh, ax=ax, label='task-clock:u (geometric mean)')
+
+    ax.set_xticks(range(len(solvers)))
+    ax.set_xticklabels(solvers)
+    label_groups(ax, labels, first_bin, n_bins, axis='y')
+
+    ax.set_title(f'Task Clock Time by Problem({by}) and Solver')
+    ax.set_xlabel('Solver')
+    ax.set_ylabel('Problem')
+
+    plt.tight_layout()
+
+    return fig
+
+
+def binned_scatter(df, by='family', resolution=SCATTER_GRID):
+    """
+    Density version of the scatter plot, one panel per solver
+    The problems are grouped and sorted like in binned_heatmap, and counted on a fixed (problems x time) grid
+    """
+    solvers, grid, _, labels, _, group_starts = binned_order(df, by, HEATMAP_ROWS)
+    n_problems = len(grid)
+    columns, rows = resolution
+
+    times = grid[np.isfinite(grid) & (grid > 0)]
+    low, high = (np.log10(times.min()), np.log10(times.max()) + 1e-9) if len(times) else (0, 1)
+
+    fig, axes = plt.subplots(len(solvers), 1, figsize=(10, 2 + 1.5 * len(solvers)), sharex=True, sharey=True, squeeze=False)
+    position = np.arange(n_problems)
+    for i, solver in enumerate(solvers):
+        measured = np.isfinite(grid[:, i]) & (grid[:, i] > 0)
+        counts, _, _ = np.histogram2d(position[measured], np.log10(grid[measured, i]),
+                                      bins=(columns, rows), range=((0, max(n_problems, 1)), (low, high)))
+
+        ax = axes[i, 0]
+        ax.imshow(np.ma.masked_equal(counts.T, 0), origin='lower', aspect='auto', interpolation='nearest',
+                  extent=(0, n_problems, low, high), cmap='viridis', norm=LogNorm())
+        ax.set_ylabel(f'{solver}\nlog10 msec')
+        label_groups(ax, labels, group_starts, n_problems, axis='x')
+
+    axes[0, 0].set_title(f'Task Clock per Problem by Solver, problems grouped by {by}')
+    plt.tight_layout()
+
+    return fig
+
+
+def label_groups(ax, labels, starts, end, axis):
+    """
+    Draw the group boundaries and, if there are not too many groups, their labels
+    """
+    bounds = np.append(starts, end)
+    line = ax.axhline if axis == 'y' else ax.axvline
+    for start in bounds[1:-1]:
+        line(start - 0.5 if axis == 'y' else start, color='white', linewidth=0.5)
+
+    if len(labels) > MAX_GROUP_LABELS:
+        (ax.set_yticks if axis == 'y' else ax.set_xticks)([])
+        return
+
+    centers = (bounds[:-1] + bounds[1:]) / 2 - (0.5 if axis == 'y' else 0)
+    if axis == 'y':
+        ax.set_yticks(centers)
+        ax.set_yticklabels(labels, fontsize='small')
+    else:
+        ax.set_xticks(centers)
+        ax.set_xticklabels(labels, fontsize='small', rotation=90)
+
+
+def group_keys(by):
+    """
+    The columns to group by, the given columns followed by the solver
+    """
+    if by is None:
+        return ['solver']
+    return ([by] if isinstance(by, str) else list(by)) + ['solver']
+
+
+def summary_table(df, by=None):
+    """
+    Summarize timeouts, memouts, errors, solved problems and total time per solver,
+    and the mean, median and standard deviation of the time of the solved problems
+    With race results also the timeouts that were censored(cut off by the race, not real timeouts),
+    with repeated measurements also the mean standard deviation and relative 95% confidence interval of the single problems
+    :param by Additional columns to group by, eg. "tagset" (see tag_util.with_tagsets) to summarize every tagset in one groupby
+    """
+    keys = group_keys(by)
 
     # Create an error indicator:
     # It's True if either:
     #   - status is "Error", OR
     #   - sanity_sat is not "sat" or "unsat"
-    # But we exclude any rows where status is "Timeout"
-    df['error_indicator'] = (((df['status'] == 'Error') | (~df['sanity_sat'].isin(['sat', 'unsat'])))
-                             & (df['status'] != 'Timeout'))
+    # But we exclude any rows where status is "Timeout" or "Memout"
+    error_indicator = (((df['status'] == 'Error') | (~df['sanity_sat'].isin(['sat', 'unsat'])))
+                       & ~df['status'].isin(['Timeout', 'Memout']))
+
+    # Compute all indicators vectorized up front, so the aggregation is only sums
+    indicators = pd.DataFrame({
+        **{key: df[key] for key in keys},
+        'error_indicator': error_indicator,
+        'timeout': df['status'] == 'Timeout',
+        'memout': df['status'] == 'Memout',
+        'solved': df['sanity_sat'].isin(['sat', 'unsat']),
+        'sat': df['sanity_sat'] == 'sat',
+        'unsat': df['sanity_sat'] == 'unsat',
+        'task-clock:u': df['task-clock:u'],
+        'solved_task_clock': df['task-clock:u'].where(df['sanity_sat'].isin(['sat', 'unsat'])),
+    })
+    repeated = 'task_clock_ci' in df.columns
+    raced = 'censored' in df.columns
+    if raced:
+        indicators['censored'] = df['status'].eq('Timeout') & df['censored'].eq(True)
+    if repeated:
+        indicators['run_std'] = df['task_clock_std']
+        indicators['relative_ci'] = df['task_clock_ci'] / df['task-clock:u']
 
     # Now aggregate by solver
-    result = df.groupby('solver').agg(
+    result = indicators.groupby(keys, observed=True).agg(
         total_problems=('solver', 'count'),
-        timeout_count=('status', lambda x: (x == 'Timeout').sum()),
+        timeout_count=('timeout', 'sum'),
+        memout_count=('memout', 'sum'),
         error_count=('error_indicator', 'sum'),
-        solved_count=('sanity_sat', lambda x: x.isin(['sat', 'unsat']).sum()),
-        sat_count=('sanity_sat', lambda x: (x == 'sat').sum()),
-        unsat_count=('sanity_sat', lambda x: (x == 'unsat').sum()),
-        total_task_clock=('task-clock:u', 'sum')
+        solved_count=('solved', 'sum'),
+        sat_count=('sat', 'sum'),
+        unsat_count=('unsat', 'sum'),
+        total_task_clock=('task-clock:u', 'sum'),
+        mean_task_clock=('solved_task_clock', 'mean'),
+        median_task_clock=('solved_task_clock', 'median'),
+        std_task_clock=('solved_task_clock', 'std'),
+        **({'censored_count': ('censored', 'sum')} if raced else {}),
+        **({'mean_run_std': ('run_std', 'mean'), 'mean_relative_ci': ('relative_ci', 'mean')} if repeated else {})
     ).reset_index()
 
     return result
@@ -145,19 +350,58 @@ def cactus_plot(df):
     return fig
 
 
+def portfolio_plot(df, budget=portfolio.BUDGET):
+    """
+    Cactus plot of the single solvers against the virtual best solver, the best pair and the sequential schedule
+    """
+    _, solvers, matrix = portfolio.runtime_matrix(df)
+    matrix = np.where(matrix <= budget, matrix, np.inf)
+
+    curves = {solver: matrix[:, s] for s, solver in enumerate(solvers)}
+    curves["VBS"] = portfolio.virtual_best(matrix)
+
+    best = portfolio.best_portfolios(matrix, budget)
+    if 2 in best:
+        pair = best[2][0]
+        curves[f"Best pair ({', '.join(solvers[s] for s in pair)})"] = matrix[:, list(pair)].min(axis=1)
+
+    try:
+        slices, _ = portfolio.static_schedule(matrix, budget)
+        curves["Sequential schedule"] = portfolio.sequential_schedule(matrix, slices)[1]
+    except ValueError as e:
+        print(f"[+] No schedule in the portfolio plot: {e}")
+
+    fig, ax = plt.subplots(figsize=(10, 6))
+    for label, times in curves.items():
+        sorted_data = portfolio.cactus_data(times)
+        linestyle = '-' if label in solvers else '--'
+        ax.step(range(0, len(sorted_data) + 1), [0] + sorted_data.tolist(), where='post', label=label, linestyle=linestyle)
+
+    ax.set_yscale('log')
+    ax.set_ylabel('Task Clock: msec')
+    ax.set_xlabel('Problem Count')
+    ax.set_title('Portfolio Simulation: Virtual Best Solver and Schedules')
+    ax.legend(title='Solvers')
+    ax.grid(True)
+
+    return fig
+
+
 def sum_time_barchart(data_frame, figsize=(10, 6), ax=None):
     total_problems = data_frame["problem"].nunique()
 
     # Group the data by 'solver' and calculate the sum of 'task-clock:u'
-    summed_data = data_frame.groupby('solver')['task-clock:u'].sum().sort_values(ascending=False)
+    summed_data = data_frame.groupby('solver', observed=True)['task-clock:u'].sum().sort_values(ascending=False)
     max_value = summed_data.max()
     threshold = max_value * 0.1  # 10% of the maximum value as the threshold
 
     # Calculate the number of problems solved per solver
-    problems_solved = data_frame[data_frame["status"] == "Success"].groupby('solver').size()
+    # Solvers without any success are counted with 0, their average is nan
+    problems_solved = data_frame[data_frame["status"] == "Success"].groupby('solver', observed=True).size()
+    problems_solved = problems_solved.reindex(summed_data.index, fill_value=0)
 
     # Calculate the average time per problem for each solver
-    avg_time_per_problem = summed_data / problems_solved
+    avg_time_per_problem = summed_data / problems_solved.replace(0, np.nan)
 
     # Create the bar chart on the provided axis
     if ax is None:
@@ -236,13 +480,22 @@ def sum_time_barchart(data_frame, figsize=(10, 6), ax=None):
     return fig
 
 
-def solved_barchart(data_frame, figsize=(10, 6), ax=None):
+def solved_counts(data_frame, by=None):
+    """
+    Count the solved sat and unsat problems per solver
+    :param by Additional columns to group by, eg. "tagset" to count for every tagset in one groupby
+    :returns A DataFrame indexed by the group keys, with one column per answer
+    """
     # Filter rows where status is "Success"
     solved_df = data_frame[data_frame['status'] == 'Success']
     solved_df = solved_df[solved_df["sanity_sat"].isin(["sat", "unsat"])]  # Only accept sat or unsat
 
     # Group by 'solver' and 'sanity_sat' and count the number of successes
-    sanity_counts = solved_df.groupby(['solver', 'sanity_sat']).size().unstack(fill_value=0)
+    return solved_df.groupby(group_keys(by) + ['sanity_sat'], observed=True).size().unstack(fill_value=0)
+
+
+def solved_barchart(data_frame, figsize=(10, 6), ax=None):
+    sanity_counts = solved_counts(data_frame)
 
     # Sort by total solved count (sum of 'sat' and 'unsat')
     sanity_counts = sanity_counts.loc[sanity_counts.sum(axis=1).sort_values(ascending=False).index]
@@ -288,28 +541,57 @@ def solved_barchart(data_frame, figsize=(10, 6), ax=None):
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Print and/or visualize stats gathered by the dataparser")
-    parser.add_argument("path", type=str, help="Path to the csv containing the results")
+    parser.add_argument("path", type=str, help="Path to the parsed results(csv, parquet or feather)")
     parser.add_argument("--heatmap", action="store_true", help="Enable heatmap visualization")
     parser.add_argument("--cactus", action="store_true", help="Enable cactus chart visualization")
     parser.add_argument("--scatter", action="store_true", help="Enable scatter chart visualization")
     parser.add_argument("--table", action="store_true", help="Enable a summary table visualization")
     parser.add_argument("--solved", action="store_true", help="Enable a barchart showing solved sat/unsat instances per solver")
+    parser.add_argument("--binned",
+                        action="store_true",
+                        help="Aggregate the problems into a fixed resolution grid for the heatmap and scatter plot, for large datasets")
+    parser.add_argument("--bin-by",
+                        type=str,
+                        choices=["family", "quantile", "tagset"],
+                        default="family",
+                        help="How to group the problems for --binned, by directory, only by runtime or by tagset(requires --tags), default is family")
+    parser.add_argument("--report",
+                        type=str,
+                        help="Render the --report-plots for all problems and every tagset(with --tags) into this directory, "
+                             "with a LaTeX and HTML summary, without showing anything")
+    parser.add_argument("--report-plots",
+                        nargs="+",
+                        choices=["cactus", "solved", "time", "heatmap", "scatter", "portfolio"],
+                        default=["cactus", "solved", "time", "heatmap", "scatter", "portfolio"],
+                        help="The plots of the report, default is all")
+    parser.add_argument("--formats", nargs="+", default=["pdf", "png"], help="The file formats of the report plots, default is pdf and png")
+    parser.add_argument("--workers", type=int, default=None, help="Number of processes rendering the report, default is the number of cores")
+    parser.add_argument("--serve",
+                        type=str,
+                        nargs="?",
+                        const="127.0.0.1:8765",
+                        help="Load the results and tags once and answer queries(see analysis_client.py) on this address, "
+                             "host:port or unix:/path/to/socket, default is 127.0.0.1:8765")
     parser.add_argument("--mpl", type=str, default="qtagg", help="The matplotlib backend to use, default is qtagg")
     parser.add_argument("--save-graphs", action="store_true", help="If the generated plots are to be saved")
     parser.add_argument("--tags", type=str, help="Path to the parsed tags")
     parser.add_argument("--having", nargs='+', type=str, help="Filter results having either tag")
     parser.add_argument("--exact", nargs='+', type=str, help="Filter results having exact tags")
+    parser.add_argument("--portfolio", action="store_true", help="Simulate the virtual best solver, portfolios and schedules")
+    parser.add_argument("--budget", type=float, default=portfolio.BUDGET, help="The time budget of the portfolio simulation in msec, default is the solver timeout")
+    parser.add_argument("--by-tagset", action="store_true", help="Print the summary table for every tagset, requires --tags")
     args = parser.parse_args()
 
-    matplotlib.use(args.mpl)
+    # Reports are only written to files and the server only answers queries, no interactive backend is needed
+    matplotlib.use("agg" if args.report or args.serve else args.mpl)
 
-    df = pd.read_csv(args.path)
+    df = dataparser.load_results(args.path, COLUMNS)
 
     if args.tags:
         import tag_util
 
     # Ensure we have tags when working with tags
-    if (args.having or args.exact) and not args.tags:
+    if (args.having or args.exact or args.by_tagset or args.bin_by == "tagset") and not args.tags:
         print("If you want to filter by tags please provide parsed tags via the --tags flag")
         sys.exit(1)
 
@@ -320,7 +602,16 @@ if __name__ == "__main__":
     tags = None
     # Read tags
     if args.tags:
-        tags = pd.read_csv(args.tags)
+        tags = tag_util.TagIndex(dataparser.load_results(args.tags, ["problem", "tags"]))
+
+    if args.serve:
+        import analysis_server
+        try:
+            analysis_server.serve(df, tags, args.serve)
+        except ValueError as e:
+            print(e)
+            sys.exit(1)
+        sys.exit(0)
 
     # Filter df by tags
     if (args.having):
@@ -337,19 +628,36 @@ if __name__ == "__main__":
     if args.table:
         print(summary_table(df))
 
+    if args.by_tagset:
+        print(summary_table(tag_util.with_tagsets(df, tags), by="tagset").to_string(index=False))
+
+    if args.report:
+        import report
+        failed = report.write_report(df, args.report, args.report_plots, tags, args.formats, args.workers)
+        sys.exit(1 if failed else 0)
+
+    if args.binned and args.bin_by == "tagset":
+        df = tag_util.with_tagsets(df, tags)
+
+    if args.portfolio:
+        print(portfolio.portfolio_report(df, args.budget))
+
     figures = []
     if args.heatmap:
-        figures.append(full_heatmap(df))
+        figures.append(binned_heatmap(df, args.bin_by) if args.binned else full_heatmap(df))
 
     if args.cactus:
         figures.append(cactus_plot(df))
 
     if args.scatter:
-        figures.append(scatter(df))
+        figures.append(binned_scatter(df, args.bin_by) if args.binned else scatter(df))
 
     if args.solved:
         figures.append(solved_barchart(df))
 
+    if args.portfolio:
+        figures.append(portfolio_plot(df, args.budget))
+
     if len(figures) > 0:
         print("[+] Showing graphs")
         plt.show()